@@ -0,0 +1,115 @@
+# ⏱️ Benchmark por etapas sobre cartas sintéticas
+#   python -m benchmarks.bench_cartas --tamanos 100 1000 10000 --salida bench_resultados.json
+import argparse
+import json
+import os
+import platform
+import time
+
+from benchmarks.sinteticos import generar_lote
+from cartas.exportar import exportar_excel
+from cartas.extraccion import extraer_lote, workers_por_defecto
+from cartas.extractores import EXTRACTORES, extractor_por_defecto
+from cartas.indice import IndiceNombres, NombreDuplicado
+from cartas.motor import comparar_documentos, extraer_campos, preparar_csv
+from cartas.plantillas import PLANTILLAS
+from cartas.resultados import VistaResultados
+from cartas.segmentos import segmentar_documentos
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    valor = funcion()
+    return valor, time.perf_counter() - inicio
+
+
+def renderizar_styler(resultado, tamano=50):
+    # Lo mismo que mostrar_tabla: solo la primera página se estiliza
+    vista = VistaResultados(resultado)
+    return vista.styler(vista.pagina(vista.filtrar(), 0, tamano)).to_html()
+
+
+def emparejar(textos, df, plantilla):
+    indice = IndiceNombres(df[plantilla.columna_nombre])
+    encontrados = 0
+    for texto in textos:
+        nombre, _ = extraer_campos(texto, plantilla)
+        try:
+            encontrados += indice.buscar(nombre) is not None
+        except NombreDuplicado:
+            pass
+    return encontrados
+
+
+def extraer(pdfs, plantilla, workers, lectura_parcial, combinado, extractor=None):
+    if combinado:
+        return list(segmentar_documentos(pdfs, plantilla, workers=workers, extractor=extractor))
+    textos = extraer_lote([contenido for _, contenido in pdfs], workers=workers,
+                          plantilla=plantilla if lectura_parcial else None, extractor=extractor)
+    return list(zip([nombre for nombre, _ in pdfs], textos))
+
+
+def medir(clave, n, workers, tasa_error, paginas_anexo, lectura_parcial, combinado=False, extractor=None):
+    plantilla = PLANTILLAS[clave]
+    pdfs, df = generar_lote(clave, n, tasa_error=tasa_error, paginas_anexo=paginas_anexo, combinado=combinado)
+    datos = [contenido for _, contenido in pdfs]
+    preparar_csv(df, plantilla)
+
+    tiempos = {}
+    documentos, tiempos["extraccion"] = cronometrar(lambda: extraer(pdfs, plantilla, workers, lectura_parcial,
+                                                                    combinado, extractor))
+    nombres = [nombre for nombre, _ in documentos]
+    textos = [texto for _, texto in documentos]
+    _, tiempos["emparejamiento"] = cronometrar(lambda: emparejar(textos, df, plantilla))
+    resultado, tiempos["comparacion"] = cronometrar(
+        lambda: comparar_documentos(df, zip(nombres, textos), plantilla))
+    _, tiempos["styler"] = cronometrar(lambda: renderizar_styler(resultado))
+    excel, tiempos["excel"] = cronometrar(lambda: exportar_excel(resultado))
+    return {
+        "plantilla": clave,
+        "cartas": n,
+        "lectura_parcial": lectura_parcial,
+        "combinado": combinado,
+        "extractor": extractor,
+        "procesados": len(resultado.procesados),
+        "filas_con_errores": len(resultado.errores_por_fila),
+        "bytes_pdf": sum(len(d) for d in datos),
+        "bytes_excel": len(excel),
+        "segundos": {etapa: round(t, 4) for etapa, t in tiempos.items()},
+        "cartas_por_segundo": round(n / sum(tiempos.values()), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de validación de cartas")
+    parser.add_argument("--plantillas", nargs="+", default=sorted(PLANTILLAS), choices=sorted(PLANTILLAS))
+    parser.add_argument("--tamanos", nargs="+", type=int, default=[100, 1000, 10000])
+    parser.add_argument("--workers", type=int, default=workers_por_defecto())
+    parser.add_argument("--tasa-error", type=float, default=0.05)
+    parser.add_argument("--paginas-anexo", type=int, default=0)
+    parser.add_argument("--texto-completo", action="store_true", help="Desactiva la lectura parcial de páginas")
+    parser.add_argument("--combinado", action="store_true", help="Todas las cartas en un único PDF")
+    parser.add_argument("--extractor", choices=sorted(EXTRACTORES), default=extractor_por_defecto())
+    parser.add_argument("--salida", default="bench_resultados.json")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for clave in args.plantillas:
+        for n in args.tamanos:
+            medicion = medir(clave, n, args.workers, args.tasa_error, args.paginas_anexo,
+                             not args.texto_completo, args.combinado, args.extractor)
+            print(f"{clave:12} {n:>6} cartas  " + "  ".join(f"{etapa}={t:.3f}s" for etapa, t in medicion["segundos"].items()))
+            resultados.append(medicion)
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "workers": args.workers,
+            "resultados": resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"💾 {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
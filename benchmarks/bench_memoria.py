@@ -0,0 +1,67 @@
+# 📈 Pico de memoria de la validación por CLI, normal frente a --low-memory, cada una en su propio proceso
+# y con su propia caché en disco: lo que ahorra el bajo consumo es la caché de textos en memoria (hasta
+# 256 MB) y la mitad de los PDFs en vuelo, así que se nota con textos largos (--full-text y anexos)
+#   python -m benchmarks.bench_memoria --cartas 2000 --paginas-anexo 20 --full-text --workers 4
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.sinteticos import generar_lote
+from cartas.plantillas import PLANTILLAS
+
+
+def validar(carpeta, plantilla, workers, bajo_consumo, texto_completo):
+    resumen = carpeta / f"resumen_{int(bajo_consumo)}.json"
+    orden = [sys.executable, "-m", "bonounido", "validate", "--template", plantilla,
+             "--csv", str(carpeta / "esperado.csv"), "--pdf-dir", str(carpeta / "pdfs"),
+             "--output", str(carpeta / f"salida_{int(bajo_consumo)}.xlsx"), "--summary", str(resumen),
+             "--cache-dir", str(carpeta / f"cache_{int(bajo_consumo)}"), "--workers", str(workers), "--quiet"]
+    if bajo_consumo:
+        orden.append("--low-memory")
+    if texto_completo:
+        orden.append("--full-text")
+    inicio = time.perf_counter()
+    subprocess.run(orden, check=False)
+    segundos = time.perf_counter() - inicio
+    datos = json.loads(resumen.read_text(encoding="utf-8"))
+    return datos, segundos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pico de RSS con y sin el modo de bajo consumo")
+    parser.add_argument("--plantilla", default="acciones_es", choices=sorted(PLANTILLAS))
+    parser.add_argument("--cartas", type=int, default=2000)
+    parser.add_argument("--paginas-anexo", type=int, default=5, help="Páginas de relleno por carta, para PDFs más pesados")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--full-text", action="store_true", help="Lee todas las páginas, anexos incluidos")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        carpeta = Path(tmp)
+        pdfs, df = generar_lote(args.plantilla, args.cartas, paginas_anexo=args.paginas_anexo)
+        (carpeta / "pdfs").mkdir()
+        for nombre, datos in pdfs:
+            (carpeta / "pdfs" / nombre).write_bytes(datos)
+        df.to_csv(carpeta / "esperado.csv", index=False)
+        del pdfs
+
+        print(f"{'modo':12} {'s':>8} {'RSS pico MB':>12} {'worker MB':>10} {'procesados':>11}")
+        resumenes = {}
+        for bajo_consumo in (False, True):
+            datos, segundos = validar(carpeta, args.plantilla, args.workers, bajo_consumo, args.full_text)
+            memoria = datos["memoria"]
+            resumenes[bajo_consumo] = {k: v for k, v in datos.items() if k not in ("excel", "memoria")}
+            print(f"{'bajo consumo' if bajo_consumo else 'normal':12} {segundos:>8.2f} {memoria['rss_pico_mb']:>12}"
+                  f" {memoria['rss_pico_worker_mb']:>10} {datos['procesados']:>11}")
+        if resumenes[False] != resumenes[True]:
+            print("❌ El modo de bajo consumo cambió el resultado")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# 🔍 Micro-benchmark de búsqueda de campos: costo por carta según el largo del texto
+#   python -m benchmarks.bench_regex --paginas 0 10 100
+import argparse
+import random
+import time
+
+from benchmarks.sinteticos import RELLENO, lineas_carta, valores_aleatorios
+from cartas.motor import extraer_campos
+from cartas.plantillas import PLANTILLAS
+
+ANEXO = [RELLENO[j:j + 90] for j in range(0, len(RELLENO), 90)] * 20
+
+
+def texto_carta(clave, paginas, completa=True, anio=2025):
+    # Carta sintética seguida de `paginas` páginas de anexo; sin la línea del salario si no está completa
+    lineas = lineas_carta(clave, "ANA CRUZ PÉREZ", valores_aleatorios(clave, random.Random(0)), anio)
+    if not completa:
+        lineas = [linea for linea in lineas if "salario" not in linea.lower() and "salary" not in linea.lower()]
+    return "\n".join(lineas + ANEXO * paginas) + "\n"
+
+
+def microsegundos(texto, plantilla, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        extraer_campos(texto, plantilla)
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Costo de extraer_campos por carta según su largo")
+    parser.add_argument("--plantillas", nargs="+", default=sorted(PLANTILLAS), choices=sorted(PLANTILLAS))
+    parser.add_argument("--paginas", nargs="+", type=int, default=[0, 10, 100])
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"{'plantilla':12} {'páginas':>8} {'caracteres':>11} {'completa µs':>12} {'sin salario µs':>15}")
+    for clave in args.plantillas:
+        plantilla = PLANTILLAS[clave]
+        for paginas in args.paginas:
+            completa = texto_carta(clave, paginas)
+            incompleta = texto_carta(clave, paginas, completa=False)
+            assert None not in extraer_campos(completa, plantilla)
+            print(f"{clave:12} {paginas:>8} {len(completa):>11} {microsegundos(completa, plantilla, args.repeticiones):>12.1f}"
+                  f" {microsegundos(incompleta, plantilla, args.repeticiones):>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
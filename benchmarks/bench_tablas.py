@@ -0,0 +1,74 @@
+# 📋 Benchmark de ingesta de la tabla esperada: lectura y normalización por formato, y el rerun desde la caché
+#   python -m benchmarks.bench_tablas --filas 10000 100000
+import argparse
+import io
+import random
+import time
+
+import pandas as pd
+
+from benchmarks.sinteticos import nombres_unicos, valores_aleatorios
+from cartas.plantillas import PLANTILLAS, comparar_columnas
+from cartas.tablas import CacheTablas, cargar_tabla
+
+
+class Archivo(io.BytesIO):
+    # Como un UploadedFile de Streamlit: bytes con nombre
+    def __init__(self, datos, name):
+        super().__init__(datos)
+        self.name = name
+
+
+def tabla(clave, filas):
+    rnd = random.Random(0)
+    plantilla = PLANTILLAS[clave]
+    valores = [valores_aleatorios(clave, rnd) for _ in range(filas)]
+    df = pd.DataFrame(valores, columns=plantilla.columnas[1:])
+    df.insert(0, plantilla.columna_nombre, [n.title() for n in nombres_unicos(filas, rnd)])
+    return df
+
+
+def archivos(df):
+    # Formato → bytes; Parquet y Arrow solo si pyarrow está instalado
+    salida = {"csv": df.to_csv(index=False).encode("utf-8")}
+    for formato, escribir in (("parquet", df.to_parquet), ("arrow", df.to_feather)):
+        buffer = io.BytesIO()
+        try:
+            escribir(buffer)
+        except ImportError:
+            continue
+        salida[formato] = buffer.getvalue()
+    return salida
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    valor = funcion()
+    return valor, time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lectura y normalización de la tabla esperada por formato")
+    parser.add_argument("--plantilla", default="acciones_es", choices=sorted(PLANTILLAS))
+    parser.add_argument("--filas", nargs="+", type=int, default=[10000, 100000])
+    args = parser.parse_args(argv)
+    plantilla = PLANTILLAS[args.plantilla]
+    campos = plantilla.columnas[1:]
+
+    print(f"{'filas':>8} {'formato':8} {'MB':>7} {'lectura s':>10} {'caché ms':>9} {'comparación s':>14}")
+    for filas in args.filas:
+        for formato, datos in archivos(tabla(args.plantilla, filas)).items():
+            cache = CacheTablas()
+            nombre = f"tabla.{formato}"
+            df, lectura = cronometrar(lambda: cargar_tabla(Archivo(datos, nombre), plantilla, cache))
+            _, rerun = cronometrar(lambda: cargar_tabla(Archivo(datos, nombre), plantilla, cache))
+            # Lo que leería el PDF: los mismos importes como texto limpio
+            extraidos = df[campos].astype("Float64").div(100).astype(str).to_numpy(dtype=object)
+            coincide, comparacion = cronometrar(lambda: comparar_columnas(extraidos, df[campos], plantilla))
+            assert coincide.all()
+            print(f"{filas:>8} {formato:8} {len(datos) / 1024 / 1024:>7.1f} {lectura:>10.3f} {rerun * 1000:>9.2f}"
+                  f" {comparacion:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
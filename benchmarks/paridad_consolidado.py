@@ -0,0 +1,96 @@
+# 🧩 Paridad del modo consolidado: una pila mezclada de las cuatro plantillas debe dar, por plantilla,
+# lo mismo que validar cada plantilla por separado con solo sus cartas, y la lectura parcial lo mismo que el
+# texto completo (también con cartas cuya frase distintiva cae en la segunda página)
+#   python -m benchmarks.paridad_consolidado --cartas 200
+import argparse
+import random
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.sinteticos import generar_lote, lineas_carta, nombres_unicos, pdf_desde_paginas, valores_aleatorios
+from cartas.consolidado import TODAS, comparar_consolidado
+from cartas.extraccion import extraer_documentos
+from cartas.motor import comparar_documentos, preparar_csv
+from cartas.plantillas import PLANTILLAS
+from cartas.revision import SIN_PLANTILLA
+
+
+def firma(resultado):
+    # Por archivo: la pila mezclada llega en otro orden que los lotes separados
+    return (sorted(zip(resultado.origenes, resultado.procesados, map(int, resultado.estado), resultado.notas)),
+            sorted(resultado.omitidos), sorted(resultado.sin_emparejar), resultado.errores_por_fila)
+
+
+def cartas_partidas(n, semilla=99):
+    # Cartas de acciones_en cuya primera página ya trae todos los campos de bono_en (misma ancla);
+    # "virtual shares" y el importe en MXN quedan en la segunda página
+    rnd = random.Random(semilla)
+    plantilla = PLANTILLAS["acciones_en"]
+    pdfs, filas = [], []
+    for i, nombre in enumerate(nombres_unicos(n, rnd)):
+        nombre = f"{nombre} ANEXO"
+        valores = valores_aleatorios("acciones_en", rnd)
+        lineas = lineas_carta("acciones_en", nombre, valores)
+        primera = lineas[:6] + [f"you have been assigned {valores[0]:,}"] + lineas[7:10]
+        segunda = ["virtual shares under the long term incentive plan."] + lineas[10:]
+        pdfs.append((f"acciones_en_partida_{i:03d}.pdf", pdf_desde_paginas([primera, segunda])))
+        fila = [nombre.title()] + [f"{v:,.2f}" if isinstance(v, float) else v for v in valores]
+        filas.append(fila)
+    return pdfs, pd.DataFrame(filas, columns=plantilla.columnas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modo consolidado frente a una validación por plantilla")
+    parser.add_argument("--cartas", type=int, default=200, help="Cartas por plantilla")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--texto-completo", action="store_true", help="Desactiva la lectura parcial de páginas")
+    args = parser.parse_args(argv)
+
+    lotes = {clave: generar_lote(clave, args.cartas, semilla=i) for i, clave in enumerate(PLANTILLAS)}
+    partidas, df_partidas = cartas_partidas(max(args.cartas // 20, 1))
+    pdfs, df = lotes["acciones_en"]
+    lotes["acciones_en"] = (pdfs + partidas, pd.concat([df, df_partidas], ignore_index=True))
+    ajenos = [("circular.pdf", pdf_desde_paginas([["Aviso general para todo el personal"]]))]
+    pila = [pdf for pdfs, _ in lotes.values() for pdf in pdfs] + ajenos
+    random.Random(0).shuffle(pila)
+
+    diferencias = 0
+    inicio = time.perf_counter()
+    textos = extraer_documentos(pila, workers=args.workers, plantilla=None if args.texto_completo else TODAS)
+    dfs = {clave: preparar_csv(df.copy(), PLANTILLAS[clave]) for clave, (_, df) in lotes.items()}
+    consolidado = comparar_consolidado(dfs, textos)
+    segundos = time.perf_counter() - inicio
+    print(f"consolidado  {len(pila)} PDFs en {segundos:.3f}s: {dict(consolidado.clasificados)}")
+    if not args.texto_completo:
+        completo = comparar_consolidado(dfs, extraer_documentos(pila, workers=args.workers))
+        for clave, resultado in completo.resultados.items():
+            if firma(consolidado.resultados[clave]) != firma(resultado):
+                diferencias += 1
+                print(f"  ≠ {clave}: la lectura parcial no da lo mismo que el texto completo")
+
+    for clave, (pdfs, df) in lotes.items():
+        plantilla = PLANTILLAS[clave]
+        inicio = time.perf_counter()
+        textos = extraer_documentos(pdfs, workers=args.workers, plantilla=None if args.texto_completo else plantilla)
+        separado = comparar_documentos(preparar_csv(df.copy(), plantilla), textos, plantilla)
+        print(f"{clave:12} {len(pdfs)} PDFs en {time.perf_counter() - inicio:.3f}s")
+        if consolidado.clasificados[clave] != len(pdfs):
+            diferencias += 1
+            print(f"  ≠ {clave}: {consolidado.clasificados[clave]} clasificados de {len(pdfs)}")
+        if firma(consolidado.resultados[clave]) != firma(separado):
+            diferencias += 1
+            print(f"  ≠ {clave}: resultado distinto al de la validación separada")
+    if [pdf for pdf, motivo, _ in consolidado.omitidos if motivo == SIN_PLANTILLA] != [pdf for pdf, _ in ajenos]:
+        diferencias += 1
+        print(f"  ≠ omitidos: {consolidado.omitidos}")
+    if diferencias:
+        print(f"❌ {diferencias} diferencias entre el modo consolidado y las validaciones separadas")
+        return 1
+    print("✅ Mismo resultado por plantilla que validando cada una por separado")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+# ⚖️ Paridad de motores: todos los extractores instalados deben dar los mismos campos por carta.
+# tests/test_extractores.py lo comprueba en pocas cartas; aquí, a escala y con la velocidad de cada motor
+#   python -m benchmarks.paridad_extractores --cartas 200 --paginas-anexo 2
+import argparse
+import sys
+import time
+
+from benchmarks.sinteticos import generar_lote
+from cartas.extraccion import extraer_documentos
+from cartas.extractores import disponibles
+from cartas.motor import extraer_campos
+from cartas.plantillas import PLANTILLAS
+
+
+def leer_campos(pdfs, plantilla, extractor, lectura_parcial):
+    # archivo → (nombre, datos) y segundos de extracción, en un solo proceso para comparar motores
+    inicio = time.perf_counter()
+    textos = list(extraer_documentos(pdfs, workers=1, extractor=extractor,
+                                     plantilla=plantilla if lectura_parcial else None))
+    segundos = time.perf_counter() - inicio
+    return {nombre: extraer_campos(texto, plantilla) for nombre, texto in textos}, segundos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paridad de campos extraídos entre motores de PDF")
+    parser.add_argument("--plantillas", nargs="+", default=sorted(PLANTILLAS), choices=sorted(PLANTILLAS))
+    parser.add_argument("--extractores", nargs="+", default=disponibles(), choices=disponibles())
+    parser.add_argument("--cartas", type=int, default=200)
+    parser.add_argument("--paginas-anexo", type=int, default=2)
+    parser.add_argument("--texto-completo", action="store_true", help="Desactiva la lectura parcial de páginas")
+    args = parser.parse_args(argv)
+
+    diferencias = 0
+    for clave in args.plantillas:
+        plantilla = PLANTILLAS[clave]
+        pdfs, _ = generar_lote(clave, args.cartas, paginas_anexo=args.paginas_anexo)
+        referencia = None
+        for extractor in args.extractores:
+            campos, segundos = leer_campos(pdfs, plantilla, extractor, not args.texto_completo)
+            print(f"{clave:12} {extractor:10} {segundos:7.3f}s  {len(pdfs) / segundos:8.1f} cartas/s")
+            if referencia is None:
+                referencia = extractor, campos
+                continue
+            for nombre, esperado in referencia[1].items():
+                if campos[nombre] != esperado:
+                    diferencias += 1
+                    print(f"  ≠ {nombre}: {referencia[0]}={esperado} {extractor}={campos[nombre]}")
+    if diferencias:
+        print(f"❌ {diferencias} cartas con campos distintos entre motores")
+        return 1
+    print(f"✅ Mismos campos con {', '.join(args.extractores)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# 🧪 Generador de cartas sintéticas (PDF) y CSVs para las cuatro plantillas
+import random
+
+import pandas as pd
+
+from cartas.plantillas import PLANTILLAS
+
+NOMBRES = ["JOSÉ", "MARÍA", "JUAN", "ANA", "LUIS", "SOFÍA", "CARLOS", "LUCÍA", "JORGE", "ELENA",
+           "MIGUEL", "ISABEL", "RAÚL", "PATRICIA", "ANDRÉS", "VERÓNICA", "DIEGO", "MÓNICA"]
+APELLIDOS = ["PÉREZ", "GARCÍA", "LÓPEZ", "MARTÍNEZ", "RODRÍGUEZ", "HERNÁNDEZ", "GONZÁLEZ", "SÁNCHEZ",
+             "RAMÍREZ", "TORRES", "FLORES", "RIVERA", "GÓMEZ", "DÍAZ", "CRUZ", "MORALES", "ORTIZ", "CASTILLO",
+             "NÚÑEZ", "VARGAS", "MENDOZA", "RUIZ", "AGUILAR", "JIMÉNEZ"]
+
+RELLENO = ("Este anexo describe las condiciones generales del plan, los periodos de consolidación, "
+           "el tratamiento fiscal aplicable y las causas de terminación anticipada del beneficio.")
+
+
+# ✉️ Texto de cada carta, con la misma redacción que las cartas reales de cada plantilla
+def lineas_carta(clave, nombre, valores, anio=2025):
+    if clave == "acciones_es":
+        acciones, factor, target, salario, mxn = valores
+        return [
+            "Ciudad de México", f"Junio {anio}", "", nombre, "Presente", "",
+            "Nos complace informarte que como parte del plan de incentivos de largo plazo",
+            f"se te ha asignado un total de {acciones:,} acciones virtuales.",
+            f"Factor financiero que reportas: {factor}",
+            f"Porcentaje de target que te corresponden: {target}",
+            f"Salario diario al 31 de diciembre de {anio - 1}: {salario:,.2f}",
+            f"Lo anterior es equivalente a {mxn:,.2f} MXN.",
+        ]
+    if clave == "acciones_en":
+        acciones, factor, target, salario, mxn = valores
+        return [
+            "Mexico City", f"May, {anio}", "", nombre, "",
+            "We are pleased to inform you that as part of the long term incentive plan",
+            f"you have been assigned {acciones:,} virtual shares.",
+            f"The financial factor reported for your area: {factor}",
+            f"Your target bonus percentage: {target}%",
+            f"Annual salary as of December {anio - 1}: {salario:,.2f}",
+            f"This grant is equivalent to {mxn:,.2f} MXN.",
+        ]
+    if clave == "bono_es":
+        bono, factor, dias, salario = valores
+        return [
+            "Ciudad de México", f"Mayo {anio}", "", nombre, "Presente", "",
+            f"Te informamos que se te ha asignado un bono diferido de {bono:,.2f} pesos.",
+            f"Factor financiero que reportas: {factor}",
+            f"Días de bono que te corresponden: {dias}",
+            f"Salario diario al 31 de diciembre de {anio - 1}: {salario:,.2f}",
+        ]
+    if clave == "bono_en":
+        bono, factor, target, salario = valores
+        return [
+            "Mexico City", f"May, {anio}", "", nombre, "",
+            f"We inform you that you have been assigned {bono:,.2f} as deferred bonus.",
+            f"The financial factor reported for your area: {factor}",
+            f"Your target bonus percentage: {target}%",
+            f"Annual salary as of December {anio - 1}: {salario:,.2f}",
+        ]
+    raise KeyError(clave)
+
+
+def valores_aleatorios(clave, rnd):
+    factor = rnd.randint(80, 120)
+    salario = round(rnd.uniform(500, 9000), 2)
+    if clave.startswith("acciones"):
+        acciones = rnd.randint(100, 50000)
+        return acciones, factor, rnd.randint(10, 40), salario, round(acciones * rnd.uniform(5, 30), 2)
+    if clave == "bono_es":
+        return round(rnd.uniform(1000, 500000), 2), factor, rnd.randint(15, 90), salario
+    return round(rnd.uniform(1000, 500000), 2), factor, rnd.randint(10, 40), salario
+
+
+def nombres_unicos(n, rnd):
+    vistos = set()
+    while len(vistos) < n:
+        nombre = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+        if nombre in vistos:
+            nombre = f"{nombre} {len(vistos)}"
+        vistos.add(nombre)
+    return sorted(vistos)
+
+
+def _escapar(linea):
+    return linea.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_desde_paginas(paginas):
+    # PDF mínimo con texto Helvetica (WinAnsi); suficiente para cualquier extractor
+    objetos = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    n = len(paginas)
+    hijos = " ".join(f"{3 + 2 * i} 0 R" for i in range(n))
+    objetos.append(f"<< /Type /Pages /Kids [{hijos}] /Count {n} >>")
+    fuente = 3 + 2 * n
+    for i, lineas in enumerate(paginas):
+        contenido = "BT /F1 11 Tf 14 TL 72 740 Td " + " ".join(f"({_escapar(l)}) Tj T*" for l in lineas) + " ET"
+        contenido = contenido.encode("cp1252")
+        objetos.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 {fuente} 0 R >> >> /Contents {4 + 2 * i} 0 R >>")
+        objetos.append((f"<< /Length {len(contenido)} >>\nstream\n".encode() + contenido + b"\nendstream"))
+    objetos.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    salida = bytearray(b"%PDF-1.4\n")
+    desplazamientos = []
+    for i, objeto in enumerate(objetos):
+        desplazamientos.append(len(salida))
+        cuerpo = objeto if isinstance(objeto, bytes) else objeto.encode("cp1252")
+        salida += f"{i + 1} 0 obj\n".encode() + cuerpo + b"\nendobj\n"
+    xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    salida += b"".join(f"{d:010d} 00000 n \n".encode() for d in desplazamientos)
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(salida)
+
+
+def generar_lote(clave, n, tasa_error=0.05, tasa_sin_csv=0.01, paginas_anexo=0, semilla=0, anio=2025,
+                 combinado=False):
+    # Devuelve (pdfs, df): pdfs es una lista de (nombre de archivo, bytes); df es el CSV esperado.
+    # `tasa_error` altera un campo del CSV; `tasa_sin_csv` deja cartas sin fila en el CSV.
+    # Con `combinado`, todas las cartas van en un único PDF, como las genera la combinación de correspondencia
+    rnd = random.Random(semilla)
+    plantilla = PLANTILLAS[clave]
+    campos = plantilla.columnas[1:]
+    pdfs = []
+    todas = []
+    filas = []
+    for i, nombre in enumerate(nombres_unicos(n, rnd)):
+        valores = valores_aleatorios(clave, rnd)
+        paginas = [lineas_carta(clave, nombre, valores, anio)]
+        paginas += [[RELLENO[j:j + 90] for j in range(0, len(RELLENO), 90)] * 20] * paginas_anexo
+        if combinado:
+            todas += paginas
+        else:
+            pdfs.append((f"{clave}_{i:05d}.pdf", pdf_desde_paginas(paginas)))
+        if rnd.random() < tasa_sin_csv:
+            continue
+        fila = dict(zip(campos, valores))
+        if rnd.random() < tasa_error:
+            campo = rnd.choice(campos)
+            fila[campo] = fila[campo] + 1
+        for campo, valor in fila.items():
+            if isinstance(valor, float):
+                fila[campo] = f"{valor:,.2f}"
+        fila[plantilla.columna_nombre] = nombre.title()
+        filas.append(fila)
+    if combinado:
+        pdfs.append((f"{clave}_combinado.pdf", pdf_desde_paginas(todas)))
+    return pdfs, pd.DataFrame(filas, columns=plantilla.columnas)
@@ -1,11 +1,33 @@
 # 📦 Importamos las bibliotecas necesarias
+import sys
+
+# 🖥️ Modo línea de comandos: python -m bonounido validate|consolidate|history ... (no necesita Streamlit)
+if __name__ == "__main__" and sys.argv[1:2] in (["validate"], ["consolidate"], ["history"]):
+    from cartas.cli import main
+    sys.exit(main(sys.argv[1:]))
+
 import streamlit as st
 import pandas as pd
-import re
-from PyPDF2 import PdfReader
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-import tempfile
+import os
+from contextlib import nullcontext
+from datetime import datetime
+from cartas.almacen import Almacen
+from cartas.cache import CacheTextos
+from cartas.consolidado import comparar_consolidado
+from cartas.consumo import MedicionRSS
+from cartas.exportar import exportar_consolidado, exportar_excel
+from cartas.archivos import TIPOS_SUBIDA, anotar_archivos, contar_documentos, iterar_documentos
+from cartas.extraccion import extraer_documentos, workers_por_defecto
+from cartas.extractores import disponibles, extractor_por_defecto
+from cartas.instrumentacion import Instrumentacion
+from cartas.indice import UMBRAL_SIMILITUD
+from cartas.incremental import MemoriaValidacion
+from cartas.motor import comparar_campos, comparar_documentos
+from cartas.plantillas import PLANTILLAS
+from cartas.resultados import VistaResultados
+from cartas.segmentos import segmentar_documentos
+from cartas.tablas import TIPOS_TABLA, CacheTablas, ColumnasFaltantes, cargar_tabla
+from cartas.trabajos import CANCELADO, FALLIDO, TERMINADO, Trabajo
 
 # 🎨 Configuración inicial
 st.set_page_config(
@@ -48,553 +70,543 @@ if not verificar_acceso():
     st.stop()
 
 
-# 🗂️ Pestañas principales
-tab_acciones_es, tab_acciones_en, tab_bono_es, tab_bono_en = st.tabs([
-    "🇪🇸 Acciones", "🇺🇸 Virtual Shares", "🇪🇸 Bono Diferido", "🇺🇸 Deferred Bonus"
-])
-
-# ─────────────────────────────────────────────────────────────
-# 🇪🇸 Comparador de Acciones Español
-with tab_acciones_es:
-    st.header("📂 Acciones")
-
-    def limpiar_es(valor):
-        return str(valor).replace(",", "").replace("\xa0", "").replace("\u200b", "").replace(" ", "").replace("%", "").strip()
-
-    def comparar_valores_es(pdf_valor, csv_valor):
-        pdf_valor = limpiar_es(pdf_valor)
-        csv_valor = limpiar_es(csv_valor)
-        try:
-            pdf_float = round(float(pdf_valor), 2)
-            csv_float = round(float(csv_valor), 2)
-            return abs(pdf_float - csv_float) < 0.01
-        except ValueError:
-            return pdf_valor == csv_valor
-
-    def extraer_datos_acciones_es(texto):
-        acciones = re.search(r'asignado.*?([\d,]+)', texto, re.IGNORECASE)
-        factor = re.search(r'reportas.*?:\s*([\d]+)', texto, re.IGNORECASE)
-        porcentaje = re.search(r'corresponden.*?:\s*([\d]+)', texto, re.IGNORECASE)
-        salario = re.search(r'2024.*?:\s*([\d,]+(?:\.\d{2})?)', texto, re.IGNORECASE)
-        equivalente = re.search(r'equivalente a\s*([\d,]+(?:\.\d{2})?)', texto, re.IGNORECASE)
-        if acciones and factor and porcentaje and salario and equivalente:
-            return (
-                limpiar_es(acciones.group(1)),
-                limpiar_es(factor.group(1)),
-                limpiar_es(porcentaje.group(1)),
-                "{:.2f}".format(float(limpiar_es(salario.group(1)))),
-                "{:.2f}".format(float(limpiar_es(equivalente.group(1))))
-            )
-        return None
-
-    def extraer_nombre_acciones_es(texto):
-        lineas = texto.splitlines()
-        for i, linea in enumerate(lineas):
-            if re.search(r'^Junio\s+\d{4}$', linea.strip(), re.IGNORECASE):
-                for j in range(i + 1, len(lineas)):
-                    siguiente = lineas[j].strip()
-                    if siguiente:
-                        return siguiente
-        return None
-
-    def procesar_acciones_es(df, pdf_files, columnas):
-        df[columnas[1:]] = df[columnas[1:]].applymap(limpiar_es)
-        df[columnas[0]] = df[columnas[0]].astype(str).str.upper().str.strip()
-        errores_por_fila = {}
-        comentarios = {}
-        iconos_df = df.copy()
-        iconos_df["Origen PDF"] = ""
-        notas = []
-        procesados = []
-
-        for file in pdf_files:
-            reader = PdfReader(file)
-            texto = ''.join(page.extract_text() for page in reader.pages if page.extract_text())
-            if not texto.strip():
-                continue
-            nombre_pdf = extraer_nombre_acciones_es(texto)
-            if not nombre_pdf:
-                continue
-            nombre_pdf = nombre_pdf.upper().strip()
-            if nombre_pdf not in df[columnas[0]].values:
-                continue
-            idx = df[df[columnas[0]] == nombre_pdf].index[0]
-            fila = df.loc[idx]
-            datos = extraer_datos_acciones_es(texto)
-            if not datos:
-                continue
-            errores = []
-            for campo, extraido, esperado in zip(columnas[1:], datos, [str(fila[col]) for col in columnas[1:]]):
-                if not comparar_valores_es(extraido, esperado):
-                    errores.append(campo)
-                    comentarios[(idx, campo)] = f"{campo}: En el EXCEL: {esperado}// En el PDF: {extraido}"
-                    iconos_df.at[idx, campo] = f"❌ {fila[campo]}"
-                else:
-                    iconos_df.at[idx, campo] = f"✅ {fila[campo]}"
-            if errores:
-                errores_por_fila[idx] = errores
-            iconos_df.at[idx, "Origen PDF"] = file.name
-            procesados.append(idx)
-
-        for idx in iconos_df.index:
-            fila_notas = [comentarios[(idx, col)] for col in iconos_df.columns if (idx, col) in comentarios]
-            notas.append(" | ".join(fila_notas))
-        iconos_df["Notas"] = notas
-
-        def resaltar(row):
-            idx = row.name
-            return ['background-color: #FFCCCC' if col in errores_por_fila.get(idx, []) else ''
-                    for col in iconos_df.columns]
-
-        iconos_filtrados = iconos_df.loc[procesados] if procesados else pd.DataFrame()
-        st.subheader("📊 Resultados comparados")
-        if not iconos_filtrados.empty:
-            st.dataframe(iconos_filtrados.style.apply(resaltar, axis=1), use_container_width=True)
+# 🗃️ Caché de textos compartida entre reruns y sesiones
+@st.cache_resource
+def obtener_cache_textos():
+    max_mb = int(os.environ.get("CARTAS_CACHE_MB", "256"))
+    return CacheTextos(max_bytes=max_mb * 1024 * 1024, directorio=os.environ.get("CARTAS_CACHE_DIR"))
+
+cache_textos = obtener_cache_textos()
+
+
+# Solo el nivel en disco, para el modo de bajo consumo (como --low-memory con --cache-dir)
+@st.cache_resource
+def obtener_cache_disco():
+    directorio = os.environ.get("CARTAS_CACHE_DIR")
+    return CacheTextos(max_bytes=0, directorio=directorio) if directorio else None
+
+
+# 📋 Tablas esperadas ya normalizadas, por huella del archivo: un rerun no vuelve a leer el CSV
+@st.cache_resource
+def obtener_cache_tablas():
+    return CacheTablas(max_bytes=int(os.environ.get("CARTAS_CACHE_TABLAS_MB", "256")) * 1024 * 1024)
+
+cache_tablas = obtener_cache_tablas()
+
+
+# 🗄️ Historial de validaciones en SQLite, compartido entre reruns y sesiones
+@st.cache_resource
+def obtener_almacen():
+    return Almacen(os.environ.get("CARTAS_DB", "historial_cartas.db"))
+
+almacen = obtener_almacen()
+# Con más de 64 CPUs (o CARTAS_WORKERS > 64) el valor por defecto se queda en el máximo del campo
+MAX_WORKERS = 64
+workers = st.sidebar.number_input("⚙️ Procesos de extracción", min_value=1, max_value=MAX_WORKERS,
+                                  value=min(workers_por_defecto(), MAX_WORKERS))
+motores = disponibles()
+extractor = st.sidebar.selectbox(
+    "📑 Motor de extracción de PDF", motores,
+    index=motores.index(extractor_por_defecto()) if extractor_por_defecto() in motores else 0,
+    help="Por defecto el más rápido de los instalados: pypdfium2 si está, si no PyPDF2")
+lectura_parcial = st.sidebar.checkbox("⚡ Dejar de leer páginas al encontrar todos los campos", value=True)
+segundo_plano = st.sidebar.checkbox("🧵 Validar en segundo plano", value=True)
+combinado = st.sidebar.checkbox("📚 Cada PDF contiene varias cartas (PDF combinado)", value=False)
+umbral = st.sidebar.slider("🔤 Similitud mínima de nombres (1.0 = exacta)", 0.7, 1.0, UMBRAL_SIMILITUD, 0.01)
+# Vacío = cualquier año, como --salary-year en la línea de comandos
+anio_salario = st.sidebar.number_input(
+    "📅 Año del corte de salario que citan las cartas", min_value=2000, max_value=2099, value=None,
+    placeholder="Cualquiera", step=1,
+    help="El del 31 de diciembre / December que acompaña al salario; si la carta cita otro, el salario no se toma")
+plantillas = {clave: plantilla.con_anio(anio_salario) for clave, plantilla in PLANTILLAS.items()}
+guardar_historial = st.sidebar.checkbox("🗄️ Guardar cada validación en el historial", value=True)
+bajo_consumo = st.sidebar.checkbox(
+    "🪶 Bajo consumo de memoria", value=False,
+    help="Tantos PDFs en vuelo como procesos y sin guardar textos en memoria; la caché en disco "
+         "(CARTAS_CACHE_DIR) se sigue usando. Ahorra sobre todo con PDFs largos y muchas cartas")
+# En bajo consumo no se retienen textos en memoria ni PDFs leídos de más; el disco sí, como en la CLI
+cache_extraccion = obtener_cache_disco() if bajo_consumo else cache_textos
+en_vuelo = workers if bajo_consumo else None
+
+# 🩺 Diagnóstico opcional: tiempos por etapa y por PDF de esta ejecución
+diagnostico = st.sidebar.checkbox("🩺 Diagnóstico")
+instrumentacion = None
+if diagnostico:
+    instrumentacion = Instrumentacion(memoria=st.sidebar.checkbox("Medir pico de memoria (más lento)"))
+
+
+def medir(etapa, archivo=None):
+    return instrumentacion.medir(etapa, archivo) if instrumentacion is not None else nullcontext()
+
+
+def barra_progreso(texto):
+    barra = st.progress(0.0, text=texto)
+    # Sin total (un TAR, que no se cuenta sin descomprimirlo) solo avanza la cuenta
+    return barra, lambda hechos, total: barra.progress(hechos / total if total else 0.0,
+                                                       text=f"{texto} {hechos}/{total or '?'}")
+
+
+# 🗣️ Textos de la interfaz por idioma de la carta
+TEXTOS = {
+    "es": {
+        "csv": "📂 Sube tu archivo CSV (o Parquet, Arrow, Excel)",
+        "pdf": "📥 Sube tus archivos PDF (o ZIP/TAR con PDFs)",
+        "columnas": "⚠️ El CSV debe tener las columnas: {}",
+        "lectura_tabla": "⚠️ No se pudo leer {}: {}",
+        "extrayendo": "📄 Extrayendo texto de los PDFs…",
+        "resultados": "📊 Resultados comparados",
+        "sin_coincidencias": "⚠️ No se encontraron coincidencias válidas entre los PDFs y los nombres del CSV.",
+        "generar": "📥 Generar Excel con errores resaltados",
+        "descargar": "📥 Descargar {}",
+        "sin_filas": "⚠️ No hay filas válidas para exportar.",
+        "duplicados": "⚠️ Nombres repetidos en el CSV; estos PDFs no se compararon contra ninguna fila:",
+        "aproximados": "🔤 {} cartas emparejadas por nombre aproximado",
+        "no_emparejados": "❓ {} PDFs sin fila en el CSV",
+        "similitud": "Similitud",
+        "sugerencia": "Nombre más parecido",
+        "guardado": "🗄️ Guardado en el historial como ejecución #{}",
+        "memoria_pico": "📈 Pico de memoria: {} MB (procesos de extracción: {} MB)",
+        "omitidos": "🚫 {} archivos no se compararon",
+        "motivo": "Motivo",
+        "detalle": "Detalle",
+        "motivos": {
+            "vacio": "Archivo vacío",
+            "no_es_pdf": "No es un PDF",
+            "demasiado_grande": "Demasiado grande",
+            "pdf_danado": "PDF dañado",
+            "cifrado": "PDF protegido con contraseña",
+            "sin_paginas": "PDF sin páginas",
+            "sin_capa_texto": "Sin capa de texto (¿escaneado?)",
+            "error_extraccion": "Error al extraer el texto",
+            "sin_texto": "Sin texto",
+            "sin_nombre": "No se encontró el nombre tras el ancla",
+            "no_en_csv": "Nombre que no está en el CSV",
+            "nombre_duplicado": "Nombre repetido en el CSV",
+            "campos_incompletos": "Faltan campos en la carta",
+            "sin_plantilla": "No corresponde a ninguna plantilla",
+            "sin_ancla": "Páginas sin el ancla de la plantilla (ninguna carta empieza ahí)",
+            "plantilla_sin_csv": "Su plantilla no tiene CSV",
+        },
+        "cambios": "🔄 Cambios frente a la validación anterior ({} cartas reutilizadas)",
+        "solo_errores": "Solo filas con errores",
+        "por_campo": "Campos con error",
+        "por_pdf": "Buscar PDF",
+        "por_pagina": "Filas por página",
+        "pagina": "Página",
+        "resumen_pagina": "{} filas · página {} de {}",
+        "en_progreso": "⏳ Validando en segundo plano… {} de {}",
+        "cancelar": "⛔ Cancelar",
+        "parcial": "Resultados parciales: {} cartas, {} con errores",
+        "cancelado": "⛔ Validación cancelada; se muestran los resultados parciales.",
+        "fallido": "💥 La validación falló:",
+        "reintentar": "🔁 Volver a validar",
+        "corregido": "✅ Corregido",
+        "nuevo": "❌ Nuevo error",
+    },
+    "en": {
+        "csv": "📂 Upload your CSV file (or Parquet, Arrow, Excel)",
+        "pdf": "📥 Upload your PDF files (or ZIP/TAR archives of PDFs)",
+        "columnas": "⚠️ Your CSV must contain the following columns: {}",
+        "lectura_tabla": "⚠️ Could not read {}: {}",
+        "extrayendo": "📄 Extracting PDF text…",
+        "resultados": "📊 Comparison Results",
+        "sin_coincidencias": "⚠️ No valid matches found between PDFs and CSV names.",
+        "generar": "📥 Create Excel",
+        "descargar": "📥 Download {}",
+        "sin_filas": "⚠️ No valid rows to export.",
+        "duplicados": "⚠️ Names repeated in the CSV; these PDFs were not compared against any row:",
+        "aproximados": "🔤 {} letters matched by approximate name",
+        "no_emparejados": "❓ {} PDFs with no row in the CSV",
+        "similitud": "Similarity",
+        "sugerencia": "Closest name",
+        "guardado": "🗄️ Saved to history as run #{}",
+        "memoria_pico": "📈 Peak memory: {} MB (extraction processes: {} MB)",
+        "omitidos": "🚫 {} files were not compared",
+        "motivo": "Reason",
+        "detalle": "Detail",
+        "motivos": {
+            "vacio": "Empty file",
+            "no_es_pdf": "Not a PDF",
+            "demasiado_grande": "Too large",
+            "pdf_danado": "Damaged PDF",
+            "cifrado": "Password-protected PDF",
+            "sin_paginas": "PDF without pages",
+            "sin_capa_texto": "No text layer (scanned?)",
+            "error_extraccion": "Text extraction error",
+            "sin_texto": "No text",
+            "sin_nombre": "Name not found after the anchor",
+            "no_en_csv": "Name not in the CSV",
+            "nombre_duplicado": "Name repeated in the CSV",
+            "campos_incompletos": "Letter is missing fields",
+            "sin_plantilla": "Does not match any template",
+            "sin_ancla": "Pages without the template anchor (no letter starts there)",
+            "plantilla_sin_csv": "Its template has no CSV",
+        },
+        "cambios": "🔄 Changes since the previous validation ({} letters reused)",
+        "solo_errores": "Only rows with errors",
+        "por_campo": "Fields with errors",
+        "por_pdf": "Search PDF",
+        "por_pagina": "Rows per page",
+        "pagina": "Page",
+        "resumen_pagina": "{} rows · page {} of {}",
+        "en_progreso": "⏳ Validating in the background… {} of {}",
+        "cancelar": "⛔ Cancel",
+        "parcial": "Partial results: {} letters, {} with errors",
+        "cancelado": "⛔ Validation cancelled; showing partial results.",
+        "fallido": "💥 Validation failed:",
+        "reintentar": "🔁 Validate again",
+        "corregido": "✅ Fixed",
+        "nuevo": "❌ Newly broken",
+    },
+}
+
+
+def mostrar_consumo(consumo, textos):
+    # El proceso de Streamlit es compartido: el pico incluye lo que otras sesiones hagan a la vez
+    st.caption(textos["memoria_pico"].format(consumo["rss_pico_mb"] or "—", consumo["rss_pico_worker_mb"] or "—"))
+
+
+def mostrar_cambios(resultado, memoria, textos):
+    cambios = resultado.cambios
+    filas = [(nombre, campo, textos["corregido"]) for nombre, campo in cambios.get("corregidos", [])]
+    filas += [(nombre, campo, textos["nuevo"]) for nombre, campo in cambios.get("nuevos", [])]
+    if not filas:
+        return
+    with st.expander(textos["cambios"].format(memoria.reutilizados), expanded=True):
+        st.dataframe(pd.DataFrame(filas, columns=[resultado.plantilla.columna_nombre, "Campo", ""]),
+                     use_container_width=True)
+
+
+def mostrar_tabla(resultado, textos, clave):
+    # Solo la página visible se convierte en DataFrame con estilos
+    vista = VistaResultados(resultado)
+    col_errores, col_campos, col_pdf, col_tamano = st.columns([1, 2, 2, 1])
+    solo_errores = col_errores.checkbox(textos["solo_errores"], key=f"solo_errores_{clave}")
+    campos = col_campos.multiselect(textos["por_campo"], vista.campos, key=f"campos_{clave}")
+    pdf = col_pdf.text_input(textos["por_pdf"], key=f"pdf_buscar_{clave}")
+    tamano = col_tamano.selectbox(textos["por_pagina"], [50, 100, 500], key=f"tamano_{clave}")
+    posiciones = vista.filtrar(solo_errores, campos, pdf)
+    paginas = max(1, -(-len(posiciones) // tamano))
+    numero = st.number_input(textos["pagina"], min_value=1, max_value=paginas, value=1, key=f"pagina_{clave}")
+    st.caption(textos["resumen_pagina"].format(len(posiciones), numero, paginas))
+    with medir("styler"):
+        st.dataframe(vista.styler(vista.pagina(posiciones, numero - 1, tamano)), use_container_width=True)
+
+
+def mostrar_resultado(resultado, textos, clave=None):
+    # `clave` distingue los widgets cuando la misma plantilla se muestra en dos lugares
+    plantilla = resultado.plantilla
+    clave = clave or plantilla.clave
+    procesados = resultado.procesados
+
+    st.subheader(textos["resultados"])
+    if procesados:
+        mostrar_tabla(resultado, textos, clave)
+    else:
+        st.warning(textos["sin_coincidencias"])
+
+    if resultado.duplicados:
+        st.warning(textos["duplicados"])
+        st.dataframe(pd.DataFrame(
+            [(nombre, ", ".join(str(f) for f in filas), ", ".join(pdfs))
+             for nombre, (filas, pdfs) in resultado.duplicados.items()],
+            columns=[plantilla.columna_nombre, "CSV", "PDF"],
+        ), use_container_width=True)
+
+    aproximados = [(pdf, fila, confianza) for pdf, fila, confianza
+                   in zip(resultado.origenes, resultado.procesados, resultado.confianza) if confianza < 1.0]
+    if aproximados:
+        with st.expander(textos["aproximados"].format(len(aproximados))):
+            st.dataframe(pd.DataFrame(
+                [(pdf, resultado.df.at[fila, plantilla.columna_nombre], round(confianza, 3))
+                 for pdf, fila, confianza in aproximados],
+                columns=["PDF", plantilla.columna_nombre, textos["similitud"]],
+            ), use_container_width=True)
+
+    if resultado.sin_emparejar:
+        with st.expander(textos["no_emparejados"].format(len(resultado.sin_emparejar))):
+            st.dataframe(pd.DataFrame(
+                [(pdf, nombre, sugerencia or "", round(similitud, 3))
+                 for pdf, nombre, sugerencia, similitud in resultado.sin_emparejar],
+                columns=["PDF", plantilla.columna_nombre, textos["sugerencia"], textos["similitud"]],
+            ), use_container_width=True)
+
+    if resultado.omitidos:
+        with st.expander(textos["omitidos"].format(len(resultado.omitidos))):
+            omitidos = pd.DataFrame(resultado.omitidos, columns=["PDF", textos["motivo"], textos["detalle"]])
+            omitidos[textos["motivo"]] = omitidos[textos["motivo"]].map(lambda m: textos["motivos"].get(m, m))
+            st.dataframe(omitidos[textos["motivo"]].value_counts(), use_container_width=True)
+            st.dataframe(omitidos, use_container_width=True, hide_index=True)
+
+    # 💾 Botón para exportar Excel con errores marcados
+    if st.button(textos["generar"], key=f"descargar_{clave}"):
+        if procesados:
+            with medir("excel"):
+                excel = exportar_excel(resultado)
+            st.download_button(textos["descargar"].format(plantilla.nombre_excel), excel, file_name=plantilla.nombre_excel)
         else:
-            st.warning("⚠️ No se encontraron coincidencias válidas entre los PDFs y los nombres del CSV.")
-
-        # 💾 Botón para exportar Excel con errores marcados
-        if st.button("📥 Generar Excel con errores resaltados", key="descargar_acciones_es"):
-            if procesados:
-                export_df = df.loc[procesados].copy()
-                export_df["Origen PDF"] = iconos_df.loc[procesados]["Origen PDF"]
-                export_df["Notas"] = iconos_df.loc[procesados]["Notas"]
-                with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
-                    ruta_excel = tmp.name
-                    export_df.to_excel(ruta_excel, index=False)
-                    wb = load_workbook(ruta_excel)
-                    ws = wb.active
-                    red_fill = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
-                    for idx in errores_por_fila:
-                        excel_row = list(procesados).index(idx) + 2  # +2 por encabezado
-                        for col in errores_por_fila[idx]:
-                            col_idx = list(export_df.columns).index(col) + 1
-                            ws.cell(row=excel_row, column=col_idx).fill = red_fill
-                    wb.save(ruta_excel)
-                with open(ruta_excel, "rb") as f:
-                    st.download_button("📥 Descargar comaparacion_accionesESP.xlsx", f, file_name="comaparacion_accionesESP.xlsx")
-            else:
-                st.error("⚠️ No hay filas válidas para exportar.")
-    
-
-    columnas_acciones_es = ['Nombre', 'Acciones', 'Factor financiero', 'Target', 'Salario Diario', 'Acciones MXN']
-    csv_file_es = st.file_uploader("📂 Sube tu archivo CSV", type=["csv"], key="csv_acciones_es")
-    pdf_files_es = st.file_uploader("📥 Sube tus archivos PDF", type=["pdf"], accept_multiple_files=True, key="pdf_acciones_es")
-    if csv_file_es and pdf_files_es:
-        df_es = pd.read_csv(csv_file_es)
-        if all(col in df_es.columns for col in columnas_acciones_es):
-            procesar_acciones_es(df_es, pdf_files_es, columnas_acciones_es)
-        else:
-            st.error(f"⚠️ El CSV debe tener las columnas: {columnas_acciones_es}")
-
-# ─────────────────────────────────────────────────────────────
-# 🇺🇸 Comparador de Acciones Inglés
-with tab_acciones_en:
-    st.header("📂 Virtual Shares")
-
-    def limpiar_en(valor):
-        return str(valor).replace(",", "").replace("\xa0", "").replace("\u200b", "").replace(" ", "").replace("%", "").strip()
-
-    def comparar_valores_en(pdf_valor, csv_valor):
-        pdf_valor = limpiar_en(pdf_valor)
-        csv_valor = limpiar_en(csv_valor)
-        try:
-            pdf_float = round(float(pdf_valor), 2)
-            csv_float = round(float(csv_valor), 2)
-            return abs(pdf_float - csv_float) < 0.01
-        except ValueError:
-            return pdf_valor == csv_valor
-
-    def extraer_datos_acciones_en(texto):
-        acciones = re.search(r'assigned\s+([\d,\.]+)', texto, re.IGNORECASE)
-        factor = re.search(r'financial factor.*?(\d+)', texto, re.IGNORECASE)
-        porcentaje = re.search(r'target bonus.*?(\d+(?:\.\d+)?)', texto, re.IGNORECASE)
-        salario = re.search(r'December \d{4}.*?([\d,]+\.\d{2})', texto, re.IGNORECASE)
-        equivalente = re.search(r'equivalent to\s+([\d,\.]+)', texto, re.IGNORECASE)
-        if acciones and factor and porcentaje and salario and equivalente:
-            return (
-                limpiar_en(acciones.group(1)),
-                limpiar_en(factor.group(1)),
-                limpiar_en(porcentaje.group(1)),
-                "{:.2f}".format(float(limpiar_en(salario.group(1)))),
-                "{:.2f}".format(float(limpiar_en(equivalente.group(1))))
-            )
+            st.error(textos["sin_filas"])
+
+
+# 🧵 Seguimiento de un trabajo en segundo plano: solo este fragmento se refresca cada segundo
+@st.fragment(run_every=1.0)
+def seguir_trabajo(trabajo, textos):
+    if not trabajo.activo:
+        st.rerun()
+    st.progress(trabajo.hechos / trabajo.total if trabajo.total else 0.0,
+                text=textos["en_progreso"].format(trabajo.hechos, trabajo.total or "?"))
+    if st.button(textos["cancelar"], key=f"cancelar_{trabajo.id}"):
+        trabajo.cancelar()
+    parcial = trabajo.parcial
+    if parcial is not None and parcial.procesados:
+        st.caption(textos["parcial"].format(len(parcial.procesados), len(parcial.errores_por_fila)))
+        vista = VistaResultados(parcial)
+        st.dataframe(vista.styler(vista.pagina(vista.filtrar(), 0, 50)), use_container_width=True)
+
+
+def firma_entradas(csv_file, pdf_files):
+    return (csv_file.file_id, tuple(f.file_id for f in pdf_files), lectura_parcial, combinado, umbral, extractor,
+            anio_salario)
+
+
+def registrar_en_historial(plantilla, firma, resultado, huellas, total_pdfs, textos):
+    # En modo síncrono cada rerun vuelve a validar; solo se registra una vez por juego de entradas
+    clave = f"ejecucion_{plantilla.clave}"
+    registro = st.session_state.get(clave)
+    if registro is None or registro[0] != firma:
+        registro = (firma, almacen.registrar_ejecucion(resultado, huellas, total_pdfs))
+        st.session_state[clave] = registro
+    st.caption(textos["guardado"].format(registro[1]))
+
+
+def resultado_en_segundo_plano(plantilla, csv_file, pdf_files, df, memoria, textos):
+    # El trabajo se guarda en la sesión: los reruns lo reutilizan mientras las entradas no cambien,
+    # y su resultado final sirve para la tabla y el Excel sin recalcular
+    clave = f"trabajo_{plantilla.clave}"
+    firma = firma_entradas(csv_file, pdf_files)
+    trabajo = st.session_state.get(clave)
+    if trabajo is None or trabajo.firma != firma:
+        if trabajo is not None:
+            trabajo.cancelar()
+        trabajo = Trabajo(
+            df, iterar_documentos(pdf_files), plantilla, total=contar_documentos(pdf_files), firma=firma, memoria=memoria,
+            lectura_parcial=lectura_parcial, combinado=combinado, umbral=umbral,
+            almacen=almacen if guardar_historial else None, cache=cache_extraccion, workers=workers, extractor=extractor,
+            en_vuelo=en_vuelo,
+            instrumentacion=Instrumentacion(memoria=instrumentacion.memoria) if instrumentacion is not None else None,
+        ).iniciar()
+        st.session_state[clave] = trabajo
+
+    if trabajo.activo:
+        seguir_trabajo(trabajo, textos)
         return None
-
-    def extraer_nombre_acciones_en(texto):
-        lineas = texto.splitlines()
-        for i, linea in enumerate(lineas):
-            normalizada = re.sub(r'\s+', '', linea.strip())
-            if re.search(r'^May,\d{4}$', normalizada, re.IGNORECASE):
-                for j in range(i + 1, len(lineas)):
-                    siguiente = lineas[j].strip()
-                    if siguiente:
-                        return siguiente
-        return None
-
-    def procesar_acciones_en(df, pdf_files, columnas):
-        df[columnas[1:]] = df[columnas[1:]].applymap(limpiar_en)
-        df[columnas[0]] = df[columnas[0]].astype(str).str.upper().str.strip()
-        errores_por_fila = {}
-        comentarios = {}
-        iconos_df = df.copy()
-        iconos_df["PDF SOURCE"] = ""
-        notas = []
-        procesados = []
-
-        for file in pdf_files:
-            reader = PdfReader(file)
-            texto = ''.join(page.extract_text() for page in reader.pages if page.extract_text())
-            if not texto.strip():
-                continue
-            nombre_pdf = extraer_nombre_acciones_en(texto)
-            if not nombre_pdf:
-                continue
-            nombre_pdf = nombre_pdf.upper().strip()
-            if nombre_pdf not in df[columnas[0]].values:
-                continue
-            idx = df[df[columnas[0]] == nombre_pdf].index[0]
-            fila = df.loc[idx]
-            datos = extraer_datos_acciones_en(texto)
-            if not datos:
-                continue
-            errores = []
-            for campo, extraido, esperado in zip(columnas[1:], datos, [str(fila[col]) for col in columnas[1:]]):
-                if not comparar_valores_en(extraido, esperado):
-                    errores.append(campo)
-                    comentarios[(idx, campo)] = f"{campo}: In CSV: {esperado}// In PDF: {extraido}"
-                    iconos_df.at[idx, campo] = f"❌ {fila[campo]}"
-                else:
-                    iconos_df.at[idx, campo] = f"✅ {fila[campo]}"
-            if errores:
-                errores_por_fila[idx] = errores
-            iconos_df.at[idx, "PDF SOURCE"] = file.name
-            procesados.append(idx)
-
-        for idx in iconos_df.index:
-            fila_notas = [comentarios[(idx, col)] for col in iconos_df.columns if (idx, col) in comentarios]
-            notas.append(" | ".join(fila_notas))
-        iconos_df["NOTES"] = notas
-
-        def resaltar(row):
-            idx = row.name
-            return ['background-color: #FFCCCC' if col in errores_por_fila.get(idx, []) else ''
-                    for col in iconos_df.columns]
-
-        iconos_filtrados = iconos_df.loc[procesados] if procesados else pd.DataFrame()
-        st.subheader("📊 Comparison Results")
-        if not iconos_filtrados.empty:
-            st.dataframe(iconos_filtrados.style.apply(resaltar, axis=1), use_container_width=True)
-        else:
-            st.warning("⚠️ No valid matches found between PDFs and CSV names.")
-
-
-        # 💾 Botón para exportar Excel con errores marcados
-        if st.button("📥 Create Excel", key="descargar_acciones_ING"):
-            if procesados:
-                export_df = df.loc[procesados].copy()
-                export_df["PDF SOURCE"] = iconos_df.loc[procesados]["PDF SOURCE"]
-                export_df["NOTES"] = iconos_df.loc[procesados]["NOTES"]
-                with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
-                    ruta_excel = tmp.name
-                    export_df.to_excel(ruta_excel, index=False)
-                    wb = load_workbook(ruta_excel)
-                    ws = wb.active
-                    red_fill = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
-                    for idx in errores_por_fila:
-                        excel_row = list(procesados).index(idx) + 2  # +2 por encabezado
-                        for col in errores_por_fila[idx]:
-                            col_idx = list(export_df.columns).index(col) + 1
-                            ws.cell(row=excel_row, column=col_idx).fill = red_fill
-                    wb.save(ruta_excel)
-                with open(ruta_excel, "rb") as f:
-                    st.download_button("📥 Download Compare_VirtualShares.xlsx", f, file_name="Compare_VirtualShares.xlsx")
-            else:
-                st.error("⚠️ No hay filas válidas para exportar.")    
-
-    columnas_acciones_en = ['NAME', 'VIRTUAL SHARES', 'FINANCIAL FACTOR', 'TARGET BONUS', 'ANNUAL SALARY', 'VIRTUAL SHARES MXN']
-    csv_file_en = st.file_uploader("📂 Upload your CSV file", type=["csv"], key="csv_acciones_en")
-    pdf_files_en = st.file_uploader("📥 Upload your PDF files", type=["pdf"], accept_multiple_files=True, key="pdf_acciones_en")
-    if csv_file_en and pdf_files_en:
-        df_en = pd.read_csv(csv_file_en)
-        if all(col in df_en.columns for col in columnas_acciones_en):
-            procesar_acciones_en(df_en, pdf_files_en, columnas_acciones_en)
-        else:
-            st.error(f"⚠️ Your CSV must contain the following columns: {columnas_acciones_en}")
-
-# ─────────────────────────────────────────────────────────────
-# 🇪🇸 Comparador Bono Diferido Español
-with tab_bono_es:
-    st.header("📂 Bono Diferido")
-
-    def limpiar_bono_es(valor):
-        return str(valor).replace(",", "").replace("\xa0", "").replace("\u200b", "").replace(" ", "").replace("%", "").strip()
-
-    def comparar_valores_bono_es(pdf_valor, csv_valor):
-        pdf_valor = limpiar_bono_es(pdf_valor)
-        csv_valor = limpiar_bono_es(csv_valor)
-        try:
-            return round(float(pdf_valor), 2) == round(float(csv_valor), 2)
-        except ValueError:
-            return pdf_valor == csv_valor
-
-    def extraer_datos_bono_es(texto):
-        bono = re.search(r'asignado.*?([\d,.]+)', texto, re.IGNORECASE)
-        factor = re.search(r'reportas.*?:\s*([\d]+)', texto, re.IGNORECASE)
-        porcentaje = re.search(r'corresponden.*?:\s*([\d]+)', texto, re.IGNORECASE)
-        salario = re.search(r'2024.*?:\s*([\d,]+(?:\.\d{2})?)', texto, re.IGNORECASE)
-        if bono and factor and porcentaje and salario:
-            return limpiar_bono_es(bono.group(1)), limpiar_bono_es(factor.group(1)), limpiar_bono_es(porcentaje.group(1)), "{:.2f}".format(float(limpiar_bono_es(salario.group(1))))
-        return None
-
-    def extraer_nombre_bono_es(texto):
-        lineas = texto.splitlines()
-        for i, linea in enumerate(lineas):
-            if re.search(r'^Mayo\s+\d{4}$', linea.strip(), re.IGNORECASE):
-                for j in range(i + 1, len(lineas)):
-                    siguiente = lineas[j].strip()
-                    if siguiente:
-                        return siguiente
-        return None
-
-    def comparar_bono_es(csv_file, pdf_files, columnas):
-        df = pd.read_csv(csv_file)
-        if not all(col in df.columns for col in columnas):
-            st.error(f"⚠️ El CSV debe tener las columnas: {columnas}")
+    if instrumentacion is not None and trabajo.opciones.get("instrumentacion") is not None:
+        instrumentacion.unir(trabajo.opciones["instrumentacion"])
+    if trabajo.estado == FALLIDO:
+        st.error(textos["fallido"])
+        st.code(trabajo.error)
+    elif trabajo.estado == CANCELADO:
+        st.warning(textos["cancelado"])
+    elif trabajo.ejecucion is not None:
+        st.caption(textos["guardado"].format(trabajo.ejecucion))
+    if trabajo.consumo is not None:
+        mostrar_consumo(trabajo.consumo, textos)
+    if trabajo.estado in (FALLIDO, CANCELADO) and st.button(textos["reintentar"], key=f"reintentar_{plantilla.clave}"):
+        del st.session_state[clave]
+        st.rerun()
+    return trabajo.resultado if trabajo.estado == TERMINADO else trabajo.parcial
+
+
+def mostrar_comparador(plantilla):
+    textos = TEXTOS[plantilla.idioma]
+    st.header(f"📂 {plantilla.titulo}")
+    csv_file = st.file_uploader(textos["csv"], type=TIPOS_TABLA, key=f"csv_{plantilla.clave}")
+    pdf_files = st.file_uploader(textos["pdf"], type=TIPOS_SUBIDA, accept_multiple_files=True, key=f"pdf_{plantilla.clave}")
+    if not (csv_file and pdf_files):
+        return
+    try:
+        with medir("csv"):
+            df = cargar_tabla(csv_file, plantilla, cache_tablas)
+    except ColumnasFaltantes:
+        st.error(textos["columnas"].format(plantilla.columnas))
+        return
+    except ImportError as e:  # Parquet y Arrow sin pyarrow
+        st.error(textos["lectura_tabla"].format(csv_file.name, e))
+        return
+    memoria = st.session_state.setdefault(f"memoria_{plantilla.clave}", MemoriaValidacion())
+    if segundo_plano:
+        resultado = resultado_en_segundo_plano(plantilla, csv_file, pdf_files, df, memoria, textos)
+        if resultado is None:
             return
-
-        df[columnas[1:]] = df[columnas[1:]].applymap(limpiar_bono_es)
-        df[columnas[0]] = df[columnas[0]].astype(str).str.upper().str.strip()
-
-        errores_por_fila = {}
-        comentarios = {}
-        iconos_df = df.copy()
-        iconos_df["ORIGEN PDF"] = ""
-        notas = []
-        procesados = []
-
-        for file in pdf_files:
-            reader = PdfReader(file)
-            texto = ''.join(page.extract_text() for page in reader.pages if page.extract_text())
-            if not texto.strip():
-                continue
-
-            nombre_pdf = extraer_nombre_bono_es(texto)
-            if not nombre_pdf:
-                continue
-
-            nombre_pdf = nombre_pdf.upper().strip()
-            if nombre_pdf not in df[columnas[0]].values:
-                continue
-
-            idx = df[df[columnas[0]] == nombre_pdf].index[0]
-            fila = df.loc[idx]
-            datos = extraer_datos_bono_es(texto)
-            if not datos:
-                continue
-
-            errores = []
-            for campo, extraido, esperado in zip(columnas[1:], datos, [fila[col] for col in columnas[1:]]):
-                if not comparar_valores_bono_es(extraido, esperado):
-                    errores.append(campo)
-                    comentarios[(idx, campo)] = f"{campo}: En el EXCEL: {esperado}// En el PDF: {extraido}"
-                    iconos_df.at[idx, campo] = f"❌ {fila[campo]}"
-                else:
-                    iconos_df.at[idx, campo] = f"✅ {fila[campo]}"
-
-            if errores:
-                errores_por_fila[idx] = errores
+    else:
+        # Como el trabajo en segundo plano, el resultado se guarda por firma de entradas: un rerun
+        # (filtros, descargas) no vuelve a validar ni cierra otra vez la memoria, que borraría los cambios
+        firma = firma_entradas(csv_file, pdf_files)
+        guardado = st.session_state.get(f"sincrono_{plantilla.clave}")
+        if guardado is None or guardado[0] != firma:
+            medicion = MedicionRSS()
+            barra, progreso = barra_progreso(textos["extrayendo"])
+            huellas = {}
+            archivos = []
+            entradas = anotar_archivos(iterar_documentos(pdf_files), archivos)
+            if combinado:
+                documentos = segmentar_documentos(entradas, plantilla, workers=workers,
+                                                  progreso=progreso, instrumentacion=instrumentacion, huellas=huellas,
+                                                  extractor=extractor)
             else:
-                for campo in columnas[1:]:
-                    iconos_df.at[idx, campo] = f"✅ {fila[campo]}"
-
-            iconos_df.at[idx, "ORIGEN PDF"] = file.name
-            procesados.append(idx)
-
-        for idx in iconos_df.index:
-            fila_notas = [comentarios[(idx, col)] for col in iconos_df.columns if (idx, col) in comentarios]
-            notas.append(" | ".join(fila_notas))
-        iconos_df["NOTAS"] = notas
-
-        def resaltar(row):
-            idx = row.name
-            return ['background-color: #FFCCCC' if col in errores_por_fila.get(idx, []) else ''
-                    for col in iconos_df.columns]
-
-        iconos_filtrados = iconos_df.loc[procesados] if procesados else pd.DataFrame()
-        st.subheader("📊 Resultados comparados")
-
-        if not iconos_filtrados.empty:
-            st.dataframe(iconos_filtrados.style.apply(resaltar, axis=1), use_container_width=True)
-        else:
-            st.warning("⚠️ No se encontraron coincidencias válidas entre los PDFs y los nombres del CSV.")
-
-
-        # 💾 Botón para exportar Excel con errores marcados
-        if st.button("📥 Generar Excel con errores resaltados", key="descargar_bono_es"):
-            if procesados:
-                export_df = df.loc[procesados].copy()
-                export_df["ORIGEN PDF"] = iconos_df.loc[procesados]["ORIGEN PDF"]
-                export_df["NOTAS"] = iconos_df.loc[procesados]["NOTAS"]
-                with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
-                    ruta_excel = tmp.name
-                    export_df.to_excel(ruta_excel, index=False)
-                    wb = load_workbook(ruta_excel)
-                    ws = wb.active
-                    red_fill = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
-                    for idx in errores_por_fila:
-                        excel_row = list(procesados).index(idx) + 2  # +2 por encabezado
-                        for col in errores_por_fila[idx]:
-                            col_idx = list(export_df.columns).index(col) + 1
-                            ws.cell(row=excel_row, column=col_idx).fill = red_fill
-                    wb.save(ruta_excel)
-                with open(ruta_excel, "rb") as f:
-                    st.download_button("📥 Descargar comaparacion_bonoESP.xlsx", f, file_name="comaparacion_bonoESP.xlsx")
-            else:
-                st.error("⚠️ No hay filas válidas para exportar.")
-        
-
-    columnas_bono_es = ['NOMBRE', 'BONO DIFERIDO', 'FACTOR FINANCIERO', 'DIAS BONO', 'SALARIO DIARIO']
-    csv_file_bono_es = st.file_uploader("📂 Sube tu archivo CSV", type=["csv"], key="csv_bono_es")
-    pdf_files_bono_es = st.file_uploader("📥 Sube tus PDFs", type=["pdf"], accept_multiple_files=True, key="pdf_bono_es")
-    if csv_file_bono_es and pdf_files_bono_es:
-        comparar_bono_es(csv_file_bono_es, pdf_files_bono_es, columnas_bono_es)
-
-# ─────────────────────────────────────────────────────────────
-# 🇺🇸 Comparador Bono Diferido Inglés
-with tab_bono_en:
-    st.header("📂 Deferred Bonus")
-
-    def limpiar_bono_en(valor):
-        return str(valor).replace(",", "").replace("\xa0", "").replace("\u200b", "").replace(" ", "").replace("%", "").strip()
-
-    def comparar_valores_bono_en(pdf_valor, csv_valor):
-        pdf_valor = limpiar_bono_en(pdf_valor)
-        csv_valor = limpiar_bono_en(csv_valor)
+                documentos = extraer_documentos(entradas, cache_extraccion, workers=workers,
+                                                progreso=progreso, instrumentacion=instrumentacion,
+                                                total=contar_documentos(pdf_files), huellas=huellas,
+                                                plantilla=plantilla if lectura_parcial else None, extractor=extractor,
+                                                en_vuelo=en_vuelo)
+            resultado = comparar_documentos(df, documentos, plantilla, memoria=memoria,
+                                            instrumentacion=instrumentacion, umbral=umbral)
+            barra.empty()
+            guardado = (firma, resultado, huellas, len(archivos), medicion.resumen())
+            st.session_state[f"sincrono_{plantilla.clave}"] = guardado
+        _, resultado, huellas, total_pdfs, consumo = guardado
+        if guardar_historial:
+            registrar_en_historial(plantilla, firma, resultado, huellas, total_pdfs, textos)
+        mostrar_consumo(consumo, textos)
+    mostrar_cambios(resultado, memoria, textos)
+    mostrar_resultado(resultado, textos)
+
+
+# 🧩 Consolidado: una pila mezclada de cartas de las cuatro plantillas contra sus CSV en una pasada
+def mostrar_consolidado():
+    textos = TEXTOS["es"]
+    st.header("🧩 Consolidado")
+    todas = tuple(plantillas.values())
+    columnas = st.columns(len(todas))
+    csv_files = {plantilla.clave: columna.file_uploader(plantilla.titulo, type=TIPOS_TABLA, key=f"consolidado_csv_{plantilla.clave}")
+                 for columna, plantilla in zip(columnas, todas)}
+    csv_files = {clave: csv_file for clave, csv_file in csv_files.items() if csv_file}
+    pdf_files = st.file_uploader(textos["pdf"], type=TIPOS_SUBIDA, accept_multiple_files=True, key="consolidado_pdf")
+    if not (csv_files and pdf_files):
+        return
+    dfs = {}
+    for clave, csv_file in csv_files.items():
+        plantilla = plantillas[clave]
         try:
-            return round(float(pdf_valor), 2) == round(float(csv_valor), 2)
-        except ValueError:
-            return pdf_valor == csv_valor
-
-    def extraer_datos_bono_en(texto):
-        bono = re.search(r'assigned\s+([\d,\.]+)', texto, re.IGNORECASE)
-        factor = re.search(r'financial factor.*?(\d+)', texto, re.IGNORECASE)
-        porcentaje = re.search(r'target bonus.*?(\d+(?:\.\d+)?)', texto, re.IGNORECASE)
-        salario = re.search(r'December \d{4}.*?([\d,]+\.\d{2})', texto, re.IGNORECASE)
-        if bono and factor and porcentaje and salario:
-            return limpiar_bono_en(bono.group(1)), limpiar_bono_en(factor.group(1)), limpiar_bono_en(porcentaje.group(1)), "{:.2f}".format(float(limpiar_bono_en(salario.group(1))))
-        return None
-
-    def extraer_nombre_bono_en(texto):
-        lineas = texto.splitlines()
-        for i, linea in enumerate(lineas):
-            normalizada = re.sub(r'\s+', '', linea.strip())
-            if re.search(r'^May,\d{4}$', normalizada, re.IGNORECASE):
-                for j in range(i + 1, len(lineas)):
-                    siguiente = lineas[j].strip()
-                    if siguiente:
-                        return siguiente
-        return None
-
-    def comparar_bono_en(csv_file, pdf_files, columnas):
-        df = pd.read_csv(csv_file)
-        if not all(col in df.columns for col in columnas):
-            st.error(f"⚠️ Your CSV must contain the following columns: {columnas}")
+            with medir("csv"):
+                dfs[clave] = cargar_tabla(csv_file, plantilla, cache_tablas)
+        except ColumnasFaltantes:
+            st.error(f"{plantilla.titulo}: " + TEXTOS[plantilla.idioma]["columnas"].format(plantilla.columnas))
+            return
+        except ImportError as e:  # Parquet y Arrow sin pyarrow
+            st.error(f"{plantilla.titulo}: " + TEXTOS[plantilla.idioma]["lectura_tabla"].format(csv_file.name, e))
             return
 
-        df[columnas[1:]] = df[columnas[1:]].applymap(limpiar_bono_en)
-        df[columnas[0]] = df[columnas[0]].astype(str).str.upper().str.strip()
-
-        errores_por_fila = {}
-        comentarios = {}
-        iconos_df = df.copy()
-        iconos_df["PDF SOURCE"] = ""
-        notas = []
-        procesados = []
-
-        for file in pdf_files:
-            reader = PdfReader(file)
-            texto = ''.join(page.extract_text() for page in reader.pages if page.extract_text())
-            if not texto.strip():
-                continue
-
-            nombre_pdf = extraer_nombre_bono_en(texto)
-            if not nombre_pdf:
-                continue
-
-            nombre_pdf = nombre_pdf.upper().strip()
-            if nombre_pdf not in df[columnas[0]].values:
-                continue
-
-            idx = df[df[columnas[0]] == nombre_pdf].index[0]
-            fila = df.loc[idx]
-            datos = extraer_datos_bono_en(texto)
-            if not datos:
-                continue
-
-            errores = []
-            for campo, extraido, esperado in zip(columnas[1:], datos, [fila[col] for col in columnas[1:]]):
-                if not comparar_valores_bono_en(extraido, esperado):
-                    errores.append(campo)
-                    comentarios[(idx, campo)] = f"{campo}: In CSV: {esperado}// In PDF: {extraido}"
-                    iconos_df.at[idx, campo] = f"❌ {fila[campo]}"
-                else:
-                    iconos_df.at[idx, campo] = f"✅ {fila[campo]}"
-
-            if errores:
-                errores_por_fila[idx] = errores
-            else:
-                for campo in columnas[1:]:
-                    iconos_df.at[idx, campo] = f"✅ {fila[campo]}"
-
-            iconos_df.at[idx, "PDF SOURCE"] = file.name
-            procesados.append(idx)
-
-        for idx in iconos_df.index:
-            fila_notas = [comentarios[(idx, col)] for col in iconos_df.columns if (idx, col) in comentarios]
-            notas.append(" | ".join(fila_notas))
-        iconos_df["NOTES"] = notas
-
-        def resaltar(row):
-            idx = row.name
-            return ['background-color: #FFCCCC' if col in errores_por_fila.get(idx, []) else ''
-                    for col in iconos_df.columns]
-
-        iconos_filtrados = iconos_df.loc[procesados] if procesados else pd.DataFrame()
-        st.subheader("📊 Comparison Results")
+    # Se guarda en la sesión: los reruns (filtros, páginas, descargas) no vuelven a leer los PDFs
+    firma = (tuple((clave, f.file_id) for clave, f in csv_files.items()), tuple(f.file_id for f in pdf_files),
+             lectura_parcial, umbral, extractor, anio_salario)
+    guardado = st.session_state.get("consolidado")
+    if guardado is None or guardado[0] != firma:
+        medicion = MedicionRSS()
+        barra, progreso = barra_progreso(textos["extrayendo"])
+        huellas = {}
+        documentos = extraer_documentos(iterar_documentos(pdf_files), cache_extraccion, workers=workers,
+                                        progreso=progreso, instrumentacion=instrumentacion,
+                                        total=contar_documentos(pdf_files), huellas=huellas,
+                                        plantilla=todas if lectura_parcial else None, extractor=extractor,
+                                        en_vuelo=en_vuelo)
+        consolidado = comparar_consolidado(dfs, documentos, todas, instrumentacion=instrumentacion, umbral=umbral)
+        barra.empty()
+        ejecuciones = {}
+        if guardar_historial:
+            ejecuciones = {clave: almacen.registrar_ejecucion(resultado, huellas, consolidado.clasificados[clave])
+                           for clave, resultado in consolidado.resultados.items()}
+        guardado = (firma, consolidado, ejecuciones, medicion.resumen())
+        st.session_state["consolidado"] = guardado
+    _, consolidado, ejecuciones, consumo = guardado
+    mostrar_consumo(consumo, textos)
+
+    st.dataframe(pd.DataFrame(
+        [(resultado.plantilla.titulo, consolidado.clasificados[clave], len(resultado.procesados),
+          len(resultado.errores_por_fila), len(resultado.omitidos), ejecuciones.get(clave))
+         for clave, resultado in consolidado.resultados.items()],
+        columns=["Plantilla", "PDFs", "Procesados", "Filas con errores", "Omitidos", "Ejecución"],
+    ), use_container_width=True, hide_index=True)
+    if consolidado.omitidos:
+        with st.expander(textos["omitidos"].format(len(consolidado.omitidos))):
+            omitidos = pd.DataFrame(consolidado.omitidos, columns=["PDF", textos["motivo"], textos["detalle"]])
+            omitidos[textos["motivo"]] = omitidos[textos["motivo"]].map(lambda m: textos["motivos"].get(m, m))
+            st.dataframe(omitidos, use_container_width=True, hide_index=True)
+    if st.button("📊 Generar Excel consolidado", key="consolidado_generar"):
+        with medir("excel"):
+            excel = exportar_consolidado(consolidado)
+        st.download_button("📥 Descargar consolidado.xlsx", excel, file_name="consolidado.xlsx")
+
+    for pestana, (clave, resultado) in zip(st.tabs([r.plantilla.titulo for r in consolidado.resultados.values()]),
+                                           consolidado.resultados.items()):
+        with pestana:
+            mostrar_resultado(resultado, TEXTOS[resultado.plantilla.idioma], clave=f"consolidado_{clave}")
+
+
+# 🗂️ Historial: ejecuciones pasadas y re-auditoría de cartas guardadas sin volver a leer PDFs
+def mostrar_historial():
+    st.header("🗂️ Historial")
+    ejecuciones = almacen.ejecuciones()
+    if ejecuciones.empty:
+        st.info("Todavía no hay validaciones guardadas.")
+    else:
+        st.dataframe(ejecuciones, use_container_width=True, hide_index=True)
+        ejecucion = st.selectbox("Ejecución", ejecuciones["id"], key="historial_ejecucion")
+        solo_errores = st.checkbox("Solo errores", key="historial_solo_errores")
+        detalle = almacen.resultados(ejecucion, solo_errores)
+        st.dataframe(detalle, use_container_width=True, hide_index=True)
+        st.download_button("📥 CSV", detalle.to_csv(index=False).encode("utf-8"),
+                           file_name=f"ejecucion_{ejecucion}.csv", key="historial_descargar")
+
+    nombre = st.text_input("🔎 Historial de un empleado", key="historial_nombre")
+    if nombre:
+        st.dataframe(almacen.historial(nombre), use_container_width=True, hide_index=True)
+
+    st.subheader("🔁 Re-auditar cartas guardadas contra un CSV")
+    clave = st.selectbox("Plantilla", list(PLANTILLAS), format_func=lambda c: PLANTILLAS[c].titulo,
+                         key="reauditar_plantilla")
+    desde = st.date_input("Extraídas desde", value=None, key="reauditar_desde")
+    csv_file = st.file_uploader("CSV", type=TIPOS_TABLA, key="reauditar_csv")
+    if not csv_file:
+        return
+    plantilla = plantillas[clave]
+    textos = TEXTOS[plantilla.idioma]
+    try:
+        df = cargar_tabla(csv_file, plantilla, cache_tablas)
+    except ColumnasFaltantes:
+        st.error(textos["columnas"].format(plantilla.columnas))
+        return
+    except ImportError as e:  # Parquet y Arrow sin pyarrow
+        st.error(textos["lectura_tabla"].format(csv_file.name, e))
+        return
+    inicio = datetime.combine(desde, datetime.min.time()).timestamp() if desde else None
+    resultado = comparar_campos(df, almacen.lecturas(plantilla, desde=inicio), plantilla, umbral=umbral)
+    mostrar_resultado(resultado, textos, clave=f"reauditar_{clave}")
 
-        if not iconos_filtrados.empty:
-            st.dataframe(iconos_filtrados.style.apply(resaltar, axis=1), use_container_width=True)
-        else:
-            st.warning("⚠️ No valid matches found between PDFs and CSV names.")
-
-        # 💾 Botón para exportar Excel con errores marcados
-        if st.button("📥 Create Excel", key="descargar_bono_ING"):
-            if procesados:
-                export_df = df.loc[procesados].copy()
-                export_df["PDF SOURCE"] = iconos_df.loc[procesados]["PDF SOURCE"]
-                export_df["NOTES"] = iconos_df.loc[procesados]["NOTES"]
-                with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
-                    ruta_excel = tmp.name
-                    export_df.to_excel(ruta_excel, index=False)
-                    wb = load_workbook(ruta_excel)
-                    ws = wb.active
-                    red_fill = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
-                    for idx in errores_por_fila:
-                        excel_row = list(procesados).index(idx) + 2  # +2 por encabezado
-                        for col in errores_por_fila[idx]:
-                            col_idx = list(export_df.columns).index(col) + 1
-                            ws.cell(row=excel_row, column=col_idx).fill = red_fill
-                    wb.save(ruta_excel)
-                with open(ruta_excel, "rb") as f:
-                    st.download_button("📥 Download Compare_DeferredBonus.xlsx", f, file_name="Compare_DeferredBonus.xlsx")
-            else:
-                st.error("⚠️ No hay filas válidas para exportar.") 
 
+# 🗂️ Pestañas principales
+pestanas = st.tabs(["🇪🇸 Acciones", "🇺🇸 Virtual Shares", "🇪🇸 Bono Diferido", "🇺🇸 Deferred Bonus", "🧩 Consolidado",
+                   "🗂️ Historial"])
+for pestana, clave in zip(pestanas, ["acciones_es", "acciones_en", "bono_es", "bono_en"]):
+    with pestana:
+        mostrar_comparador(plantillas[clave])
+with pestanas[-2]:
+    mostrar_consolidado()
+with pestanas[-1]:
+    mostrar_historial()
+
+
+# 🩺 Panel de diagnóstico en la barra lateral
+def mostrar_diagnostico(instrumentacion):
+    with st.sidebar.expander("🩺 Diagnóstico", expanded=True):
+        if not instrumentacion.etapas:
+            st.caption("Sin mediciones en esta ejecución.")
+            return
+        st.dataframe(instrumentacion.tabla_etapas(), use_container_width=True, hide_index=True)
+        n = st.number_input("PDFs más lentos", min_value=1, max_value=100, value=10)
+        st.dataframe(instrumentacion.mas_lentos(n), use_container_width=True, hide_index=True)
+        st.download_button("📥 Diagnóstico CSV", instrumentacion.a_csv(), file_name="diagnostico.csv")
 
-    columnas_bono_en = ['NAME', 'DEFERRED BONUS', 'FINANCIAL FACTOR', 'TARGET BONUS', 'ANNUAL SALARY']
-    csv_file_bono_en = st.file_uploader("📂 Upload your CSV file", type=["csv"], key="csv_bono_en")
-    pdf_files_bono_en = st.file_uploader("📥 Upload your PDF files", type=["pdf"], accept_multiple_files=True, key="pdf_bono_en")
-    if csv_file_bono_en and pdf_files_bono_en:
-        comparar_bono_en(csv_file_bono_en, pdf_files_bono_en, columnas_bono_en)
 
+if instrumentacion is not None:
+    mostrar_diagnostico(instrumentacion)
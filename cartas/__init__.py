@@ -0,0 +1,36 @@
+# 📦 Lógica compartida de validación de cartas VEAB (sin dependencias de Streamlit)
+from cartas.almacen import Almacen
+from cartas.archivos import contar_documentos, iterar_documentos
+from cartas.cache import CacheTextos, huella
+from cartas.consolidado import Consolidado, comparar_consolidado
+from cartas.consumo import MedicionRSS
+from cartas.exportar import exportar_consolidado, exportar_excel
+from cartas.extraccion import extraer_documentos, extraer_lote
+from cartas.extractores import EXTRACTORES, disponibles, obtener_extractor
+from cartas.instrumentacion import Instrumentacion
+from cartas.incremental import MemoriaValidacion
+from cartas.indice import IndiceNombres, NombreDuplicado, normalizar_nombre
+from cartas.motor import Resultado, comparar_campos, comparar_documentos, leer_campos, preparar_csv
+from cartas.plantillas import PLANTILLAS, Campo, Plantilla, elegir_plantilla
+from cartas.segmentos import segmentar_documentos
+from cartas.tablas import CacheTablas, ColumnasFaltantes, cargar_tabla
+from cartas.trabajos import Trabajo
+
+__all__ = [
+    "Almacen",
+    "contar_documentos", "iterar_documentos",
+    "CacheTextos", "huella",
+    "Consolidado", "comparar_consolidado",
+    "MedicionRSS",
+    "exportar_consolidado", "exportar_excel",
+    "extraer_documentos", "extraer_lote",
+    "EXTRACTORES", "disponibles", "obtener_extractor",
+    "IndiceNombres", "NombreDuplicado", "normalizar_nombre",
+    "MemoriaValidacion",
+    "Instrumentacion",
+    "Resultado", "comparar_campos", "comparar_documentos", "leer_campos", "preparar_csv",
+    "PLANTILLAS", "Campo", "Plantilla", "elegir_plantilla",
+    "segmentar_documentos",
+    "CacheTablas", "ColumnasFaltantes", "cargar_tabla",
+    "Trabajo",
+]
@@ -0,0 +1,5 @@
+import sys
+
+from cartas.cli import main
+
+sys.exit(main())
@@ -0,0 +1,155 @@
+# 🗄️ Historial en SQLite: campos extraídos por huella de PDF y resultado por campo de cada validación
+import json
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from cartas.indice import normalizar_nombre
+from cartas.motor import resumen
+from cartas.plantillas import texto_centavos, textos_csv
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS extracciones (
+    huella TEXT NOT NULL,
+    plantilla TEXT NOT NULL,
+    archivo TEXT,
+    nombre TEXT,
+    datos TEXT,
+    creado REAL NOT NULL,
+    PRIMARY KEY (huella, plantilla)
+);
+CREATE INDEX IF NOT EXISTS extracciones_nombre ON extracciones (nombre);
+CREATE INDEX IF NOT EXISTS extracciones_plantilla ON extracciones (plantilla, creado);
+
+CREATE TABLE IF NOT EXISTS ejecuciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plantilla TEXT NOT NULL,
+    creado REAL NOT NULL,
+    etiqueta TEXT,
+    pdfs INTEGER,
+    procesados INTEGER,
+    filas_con_errores INTEGER,
+    resumen TEXT
+);
+
+CREATE TABLE IF NOT EXISTS resultados (
+    ejecucion INTEGER NOT NULL REFERENCES ejecuciones (id),
+    nombre TEXT NOT NULL,
+    archivo TEXT,
+    huella TEXT,
+    campo TEXT NOT NULL,
+    esperado TEXT,
+    extraido TEXT,
+    coincide INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resultados_ejecucion ON resultados (ejecucion);
+CREATE INDEX IF NOT EXISTS resultados_nombre ON resultados (nombre);
+"""
+
+
+def fechas(df, columna="creado"):
+    df[columna] = pd.to_datetime(df[columna], unit="s").dt.floor("s")
+    return df
+
+
+class Almacen:
+    # Una conexión compartida entre el hilo de Streamlit y los trabajos en segundo plano
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript(ESQUEMA)
+
+    def _consulta(self, sql, parametros=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conexion, params=parametros)
+
+    def guardar_extracciones(self, plantilla, extraidos, huellas):
+        # extraidos: archivo → (nombre en el PDF, datos); solo se guardan los archivos con huella
+        ahora = time.time()
+        filas = [(huellas[archivo], plantilla.clave, archivo, nombre, json.dumps(datos), ahora)
+                 for archivo, (nombre, datos) in extraidos.items() if archivo in huellas]
+        with self._lock, self._conexion:
+            self._conexion.executemany("INSERT OR REPLACE INTO extracciones VALUES (?, ?, ?, ?, ?, ?)", filas)
+        return len(filas)
+
+    def registrar_ejecucion(self, resultado, huellas=None, total_pdfs=None, etiqueta=None):
+        # Guarda las extracciones y una fila por campo de cada carta procesada; devuelve el id
+        plantilla = resultado.plantilla
+        huellas = huellas or {}
+        if huellas:
+            self.guardar_extracciones(plantilla, resultado.extraidos, huellas)
+        campos = plantilla.columnas[1:]
+        total_pdfs = len(resultado.extraidos) if total_pdfs is None else total_pdfs
+        datos_resumen = resumen(resultado, total_pdfs)
+        # Columna a columna: solo los importes de las filas procesadas, nunca una copia de las filas enteras
+        esperados = [texto_centavos(resultado.df[c.columna].loc[resultado.procesados], c.decimales,
+                                    textos_csv(resultado.df, c.columna))
+                     for c in plantilla.campos]
+        filas = []
+        for pos, (fila, archivo) in enumerate(zip(resultado.procesados, resultado.origenes)):
+            nombre = normalizar_nombre(resultado.df.at[fila, plantilla.columna_nombre])
+            extraidos = resultado.extraidos[archivo][1]
+            estado = int(resultado.estado[pos])
+            for j, campo in enumerate(campos):
+                filas.append((nombre, archivo, huellas.get(archivo), campo, esperados[j][pos],
+                              extraidos[j], int(not estado >> j & 1)))
+        with self._lock, self._conexion:
+            cursor = self._conexion.execute(
+                "INSERT INTO ejecuciones (plantilla, creado, etiqueta, pdfs, procesados, filas_con_errores, resumen)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (plantilla.clave, time.time(), etiqueta, total_pdfs, len(resultado.procesados),
+                 len(resultado.errores_por_fila), json.dumps(datos_resumen, ensure_ascii=False)))
+            ejecucion = cursor.lastrowid
+            self._conexion.executemany("INSERT INTO resultados VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                       [(ejecucion, *fila) for fila in filas])
+        return ejecucion
+
+    def ejecuciones(self, plantilla=None):
+        sql = "SELECT id, plantilla, creado, etiqueta, pdfs, procesados, filas_con_errores FROM ejecuciones"
+        if plantilla is not None:
+            return fechas(self._consulta(sql + " WHERE plantilla = ? ORDER BY id DESC", (plantilla,)))
+        return fechas(self._consulta(sql + " ORDER BY id DESC"))
+
+    def resumen_ejecucion(self, ejecucion):
+        with self._lock:
+            fila = self._conexion.execute("SELECT resumen FROM ejecuciones WHERE id = ?", (ejecucion,)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def resultados(self, ejecucion, solo_errores=False):
+        sql = "SELECT nombre, archivo, campo, esperado, extraido, coincide FROM resultados WHERE ejecucion = ?"
+        if solo_errores:
+            sql += " AND coincide = 0"
+        return self._consulta(sql, (ejecucion,))
+
+    def historial(self, nombre):
+        # Todas las validaciones de un empleado, de la más reciente a la más antigua
+        return fechas(self._consulta(
+            "SELECT r.ejecucion, e.plantilla, e.creado, r.archivo, r.campo, r.esperado, r.extraido, r.coincide"
+            " FROM resultados r JOIN ejecuciones e ON e.id = r.ejecucion"
+            " WHERE r.nombre = ? ORDER BY r.ejecucion DESC",
+            (normalizar_nombre(nombre),)))
+
+    def lecturas(self, plantilla, desde=None, hasta=None):
+        # (archivo, nombre en el PDF, datos) guardados, listos para comparar_campos sin leer ningún PDF
+        sql = "SELECT archivo, nombre, datos FROM extracciones WHERE plantilla = ?"
+        parametros = [plantilla.clave]
+        if desde is not None:
+            sql += " AND creado >= ?"
+            parametros.append(desde)
+        if hasta is not None:
+            sql += " AND creado < ?"
+            parametros.append(hasta)
+        with self._lock:
+            filas = self._conexion.execute(sql + " ORDER BY archivo", parametros).fetchall()
+        for archivo, nombre, datos in filas:
+            datos = json.loads(datos)
+            yield archivo, nombre, tuple(datos) if datos is not None else None
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
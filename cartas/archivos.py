@@ -0,0 +1,93 @@
+# 🗜️ PDFs dentro de ZIP/TAR: los miembros se leen de uno en uno, sin descomprimir todo el archivo
+import io
+import os
+import tarfile
+import zipfile
+from contextlib import nullcontext
+
+from cartas.extraccion import nombre_archivo
+from cartas.revision import revisar_tamano
+
+EXTENSIONES_ZIP = (".zip",)
+EXTENSIONES_TAR = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+TIPOS_SUBIDA = ["pdf", "zip", "tar", "gz", "tgz", "bz2", "tbz2", "xz", "txz"]
+
+
+def es_comprimido(nombre):
+    return nombre.lower().endswith(EXTENSIONES_ZIP + EXTENSIONES_TAR)
+
+
+def es_pdf(ruta):
+    # Se descartan carpetas y los metadatos que añade macOS al comprimir
+    base = ruta.rsplit("/", 1)[-1]
+    return ruta.lower().endswith(".pdf") and not base.startswith("._") and not ruta.startswith("__MACOSX/")
+
+
+def abrir(archivo):
+    if isinstance(archivo, (str, os.PathLike)):
+        return open(archivo, "rb")
+    if hasattr(archivo, "getvalue"):
+        # getvalue() comparte el buffer: no duplica el archivo y no mueve la posición del original
+        return nullcontext(io.BytesIO(archivo.getvalue()))
+    archivo.seek(0)
+    return nullcontext(archivo)
+
+
+def miembros(archivo, nombre):
+    # (ruta del miembro, bytes) para cada PDF; solo hay un miembro descomprimido en memoria a la vez.
+    # Un miembro más grande que el límite ni se descomprime: llega como Rechazo en lugar de bytes
+    with abrir(archivo) as f:
+        if nombre.lower().endswith(EXTENSIONES_ZIP):
+            with zipfile.ZipFile(f) as z:
+                for info in z.infolist():
+                    if not info.is_dir() and es_pdf(info.filename):
+                        # ZipFile no entrega más de file_size bytes aunque el miembro mienta
+                        rechazo = revisar_tamano(info.file_size)
+                        yield info.filename, z.read(info) if rechazo is None else rechazo
+        else:
+            with tarfile.open(fileobj=f, mode="r|*") as t:
+                for miembro in t:
+                    if miembro.isfile() and es_pdf(miembro.name):
+                        rechazo = revisar_tamano(miembro.size)
+                        yield miembro.name, t.extractfile(miembro).read() if rechazo is None else rechazo
+
+
+def contar_miembros(archivo, nombre):
+    # PDFs de un ZIP, del índice central sin descomprimir nada; None para un TAR, que solo se
+    # cuenta descomprimiéndolo entero: el total se sabe al terminar de leerlo
+    if not nombre.lower().endswith(EXTENSIONES_ZIP):
+        return None
+    with abrir(archivo) as f:
+        with zipfile.ZipFile(f) as z:
+            return sum(not info.is_dir() and es_pdf(info.filename) for info in z.infolist())
+
+
+def iterar_documentos(archivos, nombres=None):
+    # (nombre, archivo) por cada PDF subido; los ZIP/TAR se expanden en sus miembros,
+    # que conservan su ruta interna como nombre (columna de origen del resultado)
+    for i, archivo in enumerate(archivos):
+        nombre = nombres[i] if nombres is not None else nombre_archivo(archivo, i)
+        if es_comprimido(nombre):
+            yield from miembros(archivo, nombre)
+        else:
+            yield nombre, archivo
+
+
+def anotar_archivos(documentos, archivos):
+    # Deja pasar los (nombre, archivo) y anota cada nombre en la lista `archivos`: en modo combinado
+    # un archivo da varias cartas, y el total de PDFs cuenta archivos de entrada, no cartas
+    for nombre, archivo in documentos:
+        archivos.append(nombre)
+        yield nombre, archivo
+
+
+def contar_documentos(archivos, nombres=None):
+    # None si algún TAR impide saber el total de antemano
+    total = 0
+    for i, archivo in enumerate(archivos):
+        nombre = nombres[i] if nombres is not None else nombre_archivo(archivo, i)
+        cuenta = contar_miembros(archivo, nombre) if es_comprimido(nombre) else 1
+        if cuenta is None:
+            return None
+        total += cuenta
+    return total
@@ -0,0 +1,159 @@
+# 🗃️ Caché de texto extraído de PDFs, indexada por el SHA-256 del contenido
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from cartas.extractores import POR_DEFECTO, extractor_por_defecto, obtener_extractor
+from cartas.plantillas import clasificacion_decidida, elegir_plantilla, lectura_suficiente
+from cartas.revision import ERROR_EXTRACCION, Rechazo, abrir_pdf
+
+
+def huella(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def leer_bytes(archivo):
+    # Acepta bytes, rutas, UploadedFile de Streamlit o cualquier objeto tipo archivo
+    if isinstance(archivo, (bytes, bytearray)):
+        return bytes(archivo)
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, "rb") as f:
+            return f.read()
+    if hasattr(archivo, "getvalue"):
+        return archivo.getvalue()
+    archivo.seek(0)
+    return archivo.read()
+
+
+def leer_paginas(motor, documento, plantilla=None):
+    # Una sola extracción por página. Con plantilla, deja de leer en cuanto el nombre y todos
+    # los campos aparecen, cuando ya se leyó la ventana de campos o al llegar a plantilla.max_paginas.
+    # Con una tupla de plantillas (modo consolidado) la carta se vuelve a clasificar en cada página:
+    # solo se deja de leer cuando la elegida tiene sus campos y la clasificación ya no puede cambiar
+    # (plantillas con la misma ancla se distinguen por una frase que puede estar en otra página)
+    candidatas = plantilla if isinstance(plantilla, tuple) else ()
+    if candidatas:
+        max_paginas = max(p.max_paginas for p in candidatas) if all(p.max_paginas for p in candidatas) else 0
+    else:
+        max_paginas = plantilla.max_paginas if plantilla is not None else 0
+    partes = []
+    for i in range(motor.paginas(documento)):
+        if max_paginas and i >= max_paginas:
+            break
+        texto_pagina = motor.texto(documento, i)
+        if texto_pagina:
+            partes.append(texto_pagina)
+            texto = ''.join(partes)
+            if candidatas:
+                plantilla = elegir_plantilla(texto, candidatas)
+                if plantilla is None or not clasificacion_decidida(texto, plantilla, candidatas):
+                    continue
+            if plantilla is not None and lectura_suficiente(texto, plantilla):
+                break
+    return ''.join(partes)
+
+
+def extraer_texto(datos, plantilla=None, extractor=None):
+    # Un PDF que no pasa la revisión rápida devuelve un Rechazo (texto vacío con motivo)
+    documento, rechazo = abrir_pdf(datos, extractor)
+    if rechazo is not None:
+        return rechazo
+    motor = obtener_extractor(extractor)
+    try:
+        return leer_paginas(motor, documento, plantilla)
+    except Exception as e:
+        return Rechazo(ERROR_EXTRACCION, str(e))
+    finally:
+        motor.cerrar(documento)
+
+
+def clave_texto(datos, plantilla=None, extractor=None):
+    # El texto truncado depende de la plantilla, así que se guarda aparte del texto completo.
+    # Cada motor da un texto algo distinto: salvo PyPDF2 (claves de siempre), llevan su nombre
+    clave = huella(datos)
+    if plantilla is not None:
+        # En modo consolidado la clave lleva todas las plantillas candidatas
+        if isinstance(plantilla, tuple):
+            clave += "-consolidado"
+        for p in plantilla if isinstance(plantilla, tuple) else (plantilla,):
+            clave += f"-{p.clave}" if p.anio is None else f"-{p.clave}-{p.anio}"
+    extractor = extractor or extractor_por_defecto()
+    return clave if extractor == POR_DEFECTO else f"{clave}-{extractor}"
+
+
+class CacheTextos:
+    """LRU en memoria acotada en bytes, con un nivel opcional en disco que sobrevive reinicios."""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, directorio=None):
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self._textos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def __len__(self):
+        return len(self._textos)
+
+    def __contains__(self, clave):
+        return clave in self._textos or os.path.exists(self._ruta(clave) or "")
+
+    def _ruta(self, clave):
+        if not self.directorio:
+            return None
+        return os.path.join(self.directorio, clave[:2], clave + ".txt")
+
+    def _insertar(self, clave, texto):
+        tamano = len(texto.encode("utf-8"))
+        if tamano > self.max_bytes:
+            return
+        anterior = self._textos.pop(clave, None)
+        if anterior is not None:
+            self._bytes -= len(anterior.encode("utf-8"))
+        self._textos[clave] = texto
+        self._bytes += tamano
+        while self._bytes > self.max_bytes:
+            _, expulsado = self._textos.popitem(last=False)
+            self._bytes -= len(expulsado.encode("utf-8"))
+
+    def obtener(self, clave):
+        with self._lock:
+            texto = self._textos.get(clave)
+            if texto is not None:
+                self._textos.move_to_end(clave)
+                self.aciertos += 1
+                return texto
+        ruta = self._ruta(clave)
+        if ruta and os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                texto = f.read()
+            with self._lock:
+                self._insertar(clave, texto)
+                self.aciertos += 1
+            return texto
+        with self._lock:
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave, texto):
+        with self._lock:
+            self._insertar(clave, texto)
+        ruta = self._ruta(clave)
+        if ruta and not os.path.exists(ruta):
+            # Escritura atómica: otro proceso nunca ve un archivo a medias
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(texto)
+            os.replace(tmp, ruta)
+
+    def limpiar(self):
+        with self._lock:
+            self._textos.clear()
+            self._bytes = 0
+
@@ -0,0 +1,277 @@
+# 🖥️ Validación por línea de comandos, sin navegador ni límites de subida de Streamlit
+#   python -m bonounido validate --template acciones_es --csv empleados.csv --pdf-dir cartas/
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from itertools import chain
+from pathlib import Path
+
+from cartas.almacen import Almacen
+from cartas.archivos import anotar_archivos, contar_miembros, es_comprimido, miembros
+from cartas.cache import CacheTextos
+from cartas.consolidado import TODAS, comparar_consolidado, resumen_consolidado
+from cartas.consumo import MedicionRSS
+from cartas.exportar import exportar_consolidado, exportar_excel
+from cartas.extraccion import extraer_documentos, workers_por_defecto
+from cartas.extractores import EXTRACTORES, extractor_por_defecto, obtener_extractor
+from cartas.indice import UMBRAL_SIMILITUD
+from cartas.instrumentacion import Instrumentacion
+from cartas.motor import comparar_documentos, resumen
+from cartas.plantillas import PLANTILLAS
+from cartas.segmentos import segmentar_documentos
+from cartas.tablas import TIPOS_TABLA, ColumnasFaltantes, cargar_tabla
+
+SALIDA_OK = 0
+SALIDA_DIFERENCIAS = 1
+SALIDA_ERROR = 2
+
+
+def contexto_pool():
+    # "fork" evita que los procesos hijos vuelvan a importar el script de Streamlit
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def buscar_pdfs(directorio):
+    raiz = Path(directorio)
+    return sorted(p for p in raiz.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+
+
+def imprimir_progreso(hechos, total):
+    # Sin total (TAR) solo avanza la cuenta; el salto de línea llega con el total real, al final
+    if total is None:
+        print(f"\r📄 {hechos}", end="", file=sys.stderr, flush=True)
+        return
+    print(f"\r📄 {hechos}/{total}", end="" if hechos < total else "\n", file=sys.stderr, flush=True)
+
+
+def opciones_extraccion(parser):
+    parser.add_argument("--pdf-dir", required=True, help="Directorio de PDFs, o un ZIP/TAR con ellos")
+    parser.add_argument("--summary", help="Resumen JSON (por defecto junto al Excel)")
+    parser.add_argument("--workers", type=int, default=workers_por_defecto())
+    parser.add_argument("--backend", choices=sorted(EXTRACTORES), default=extractor_por_defecto(),
+                        help="Motor de extracción de texto (por defecto el más rápido instalado)")
+    parser.add_argument("--cache-dir", default=os.environ.get("CARTAS_CACHE_DIR"))
+    parser.add_argument("--full-text", action="store_true", help="Lee todas las páginas de cada PDF")
+    parser.add_argument("--salary-year", type=int, help="Año del corte de salario que debe citar la carta "
+                                                        "(por defecto cualquiera)")
+    parser.add_argument("--min-similarity", type=float, default=UMBRAL_SIMILITUD,
+                        help="Similitud mínima para emparejar nombres aproximados (1.0 = exacta)")
+    parser.add_argument("--diagnostics", help="CSV con tiempos por etapa y por PDF")
+    parser.add_argument("--db", default=os.environ.get("CARTAS_DB"), help="Historial SQLite donde registrar la ejecución")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Bajo consumo: tantos PDFs en vuelo como workers y la caché de textos solo en disco")
+    parser.add_argument("--quiet", action="store_true")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="bonounido", description="Validación de cartas VEAB PDF vs CSV")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    validar = sub.add_parser("validate", help="Compara un directorio de PDFs contra un CSV")
+    validar.add_argument("--template", required=True, choices=sorted(PLANTILLAS))
+    validar.add_argument("--csv", required=True, help=f"Tabla esperada: {', '.join(TIPOS_TABLA)}")
+    validar.add_argument("--output", help="Excel de salida (por defecto el nombre de la plantilla)")
+    validar.add_argument("--combined", action="store_true", help="Cada PDF contiene varias cartas; se separan por el ancla")
+    opciones_extraccion(validar)
+
+    consolidar = sub.add_parser("consolidate", help="Una pila mezclada de PDFs contra el CSV de cada plantilla")
+    consolidar.add_argument("--csv", required=True, action="append", metavar="PLANTILLA=CSV",
+                            help=f"Repetible; plantillas: {', '.join(sorted(PLANTILLAS))}")
+    consolidar.add_argument("--output", default="consolidado.xlsx")
+    opciones_extraccion(consolidar)
+
+    historial = sub.add_parser("history", help="Consulta el historial SQLite")
+    historial.add_argument("--db", default=os.environ.get("CARTAS_DB", "historial_cartas.db"))
+    historial.add_argument("--run", type=int, help="Resultados por campo de una ejecución")
+    historial.add_argument("--name", help="Todas las validaciones de un empleado")
+    historial.add_argument("--errors-only", action="store_true")
+    return parser
+
+
+def listar_documentos(args):
+    # (total, documentos) del directorio o del ZIP/TAR; None si no hay PDFs o el extractor no sirve
+    if Path(args.pdf_dir).is_file() and es_comprimido(args.pdf_dir):
+        # Los miembros se leen de uno en uno; su ruta interna queda como origen
+        total = contar_miembros(args.pdf_dir, args.pdf_dir)
+        documentos = miembros(args.pdf_dir, args.pdf_dir)
+        if total is None:
+            # Un TAR no se cuenta sin descomprimirlo: basta con saber que trae algún PDF
+            primero = next(documentos, None)
+            if primero is None:
+                total = 0
+            else:
+                documentos = chain([primero], documentos)
+    else:
+        rutas = buscar_pdfs(args.pdf_dir)
+        total = len(rutas)
+        documentos = ((str(ruta.relative_to(args.pdf_dir)), ruta) for ruta in rutas)
+    if total == 0:
+        print(f"⚠️ No hay PDFs en {args.pdf_dir}", file=sys.stderr)
+        return None
+    try:
+        obtener_extractor(args.backend)
+    except ValueError as e:
+        print(f"⚠️ {e}", file=sys.stderr)
+        return None
+    if not args.quiet:
+        print(f"📑 Extractor: {args.backend}", file=sys.stderr)
+    return total, documentos
+
+
+def leer_csv(ruta, plantilla):
+    try:
+        return cargar_tabla(ruta, plantilla)
+    except ColumnasFaltantes:
+        print(f"⚠️ {ruta}: el CSV debe tener las columnas: {plantilla.columnas}", file=sys.stderr)
+    except ImportError as e:  # Parquet y Arrow sin pyarrow
+        print(f"⚠️ {ruta}: {e}", file=sys.stderr)
+    return None
+
+
+def cache_textos(args):
+    # En bajo consumo solo queda el nivel en disco de la caché
+    if not args.cache_dir:
+        return None
+    if args.low_memory:
+        return CacheTextos(max_bytes=0, directorio=args.cache_dir)
+    return CacheTextos(directorio=args.cache_dir)
+
+
+def validar(args):
+    medicion = MedicionRSS()
+    plantilla = PLANTILLAS[args.template]
+    if args.salary_year is not None:
+        plantilla = plantilla.con_anio(args.salary_year)
+    df = leer_csv(args.csv, plantilla)
+    if df is None:
+        return SALIDA_ERROR
+    listado = listar_documentos(args)
+    if listado is None:
+        return SALIDA_ERROR
+    total, documentos = listado
+    archivos = []
+    documentos = anotar_archivos(documentos, archivos)
+
+    cache = cache_textos(args)
+    instrumentacion = Instrumentacion() if args.diagnostics else None
+    progreso = None if args.quiet else imprimir_progreso
+    huellas = {}
+    if args.combined:
+        textos = segmentar_documentos(documentos, plantilla, workers=args.workers, contexto=contexto_pool(),
+                                      progreso=progreso, instrumentacion=instrumentacion, huellas=huellas,
+                                      extractor=args.backend)
+    else:
+        textos = extraer_documentos(documentos, cache, workers=args.workers, contexto=contexto_pool(),
+                                    progreso=progreso, instrumentacion=instrumentacion, total=total,
+                                    huellas=huellas, plantilla=None if args.full_text else plantilla,
+                                    extractor=args.backend, en_vuelo=args.workers if args.low_memory else None)
+    resultado = comparar_documentos(df, textos, plantilla, instrumentacion=instrumentacion,
+                                    umbral=args.min_similarity)
+
+    salida = Path(args.output or plantilla.nombre_excel)
+    datos = resumen(resultado, len(archivos))
+    datos["extractor"] = args.backend
+    if args.db:
+        almacen = Almacen(args.db)
+        datos["ejecucion"] = almacen.registrar_ejecucion(resultado, huellas, len(archivos))
+        almacen.cerrar()
+    if resultado.procesados:
+        salida.write_bytes(exportar_excel(resultado))
+        datos["excel"] = str(salida)
+    if instrumentacion is not None:
+        Path(args.diagnostics).write_bytes(instrumentacion.a_csv())
+    datos["memoria"] = medicion.resumen()
+    ruta_resumen = Path(args.summary or salida.with_suffix(".json"))
+    ruta_resumen.write_text(json.dumps(datos, ensure_ascii=False, indent=2), encoding="utf-8")
+    if not args.quiet:
+        print(json.dumps(datos, ensure_ascii=False, indent=2))
+
+    if not resultado.procesados:
+        return SALIDA_ERROR
+    if resultado.errores_por_fila or resultado.duplicados:
+        return SALIDA_DIFERENCIAS
+    return SALIDA_OK
+
+
+def consolidar(args):
+    medicion = MedicionRSS()
+    plantillas = TODAS if args.salary_year is None else tuple(p.con_anio(args.salary_year) for p in TODAS)
+    por_clave = {plantilla.clave: plantilla for plantilla in plantillas}
+    dfs = {}
+    for opcion in args.csv:
+        clave, _, ruta = opcion.partition("=")
+        if clave not in por_clave or not ruta:
+            print(f"⚠️ --csv espera PLANTILLA=CSV con PLANTILLA en {sorted(PLANTILLAS)}: {opcion}", file=sys.stderr)
+            return SALIDA_ERROR
+        dfs[clave] = leer_csv(ruta, por_clave[clave])
+        if dfs[clave] is None:
+            return SALIDA_ERROR
+    listado = listar_documentos(args)
+    if listado is None:
+        return SALIDA_ERROR
+    total, documentos = listado
+
+    cache = cache_textos(args)
+    instrumentacion = Instrumentacion() if args.diagnostics else None
+    huellas = {}
+    textos = extraer_documentos(documentos, cache, workers=args.workers, contexto=contexto_pool(),
+                                progreso=None if args.quiet else imprimir_progreso,
+                                instrumentacion=instrumentacion, total=total, huellas=huellas,
+                                plantilla=None if args.full_text else plantillas, extractor=args.backend,
+                                en_vuelo=args.workers if args.low_memory else None)
+    consolidado = comparar_consolidado(dfs, textos, plantillas, instrumentacion=instrumentacion,
+                                       umbral=args.min_similarity)
+
+    salida = Path(args.output)
+    datos = resumen_consolidado(consolidado)
+    datos["extractor"] = args.backend
+    if args.db:
+        almacen = Almacen(args.db)
+        datos["ejecuciones"] = {clave: almacen.registrar_ejecucion(resultado, huellas, consolidado.clasificados[clave])
+                                for clave, resultado in consolidado.resultados.items()}
+        almacen.cerrar()
+    salida.write_bytes(exportar_consolidado(consolidado))
+    datos["excel"] = str(salida)
+    if instrumentacion is not None:
+        Path(args.diagnostics).write_bytes(instrumentacion.a_csv())
+    datos["memoria"] = medicion.resumen()
+    ruta_resumen = Path(args.summary or salida.with_suffix(".json"))
+    ruta_resumen.write_text(json.dumps(datos, ensure_ascii=False, indent=2), encoding="utf-8")
+    if not args.quiet:
+        print(json.dumps(datos, ensure_ascii=False, indent=2))
+
+    resultados = consolidado.resultados.values()
+    if not any(resultado.procesados for resultado in resultados):
+        return SALIDA_ERROR
+    if any(resultado.errores_por_fila or resultado.duplicados for resultado in resultados):
+        return SALIDA_DIFERENCIAS
+    return SALIDA_OK
+
+
+def consultar_historial(args):
+    almacen = Almacen(args.db)
+    if args.run is not None:
+        tabla = almacen.resultados(args.run, args.errors_only)
+    elif args.name:
+        tabla = almacen.historial(args.name)
+        if args.errors_only:
+            tabla = tabla[tabla["coincide"] == 0]
+    else:
+        tabla = almacen.ejecuciones()
+    almacen.cerrar()
+    tabla.to_csv(sys.stdout, index=False)
+    return SALIDA_OK
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.comando == "validate":
+        return validar(args)
+    if args.comando == "consolidate":
+        return consolidar(args)
+    if args.comando == "history":
+        return consultar_historial(args)
+    return SALIDA_ERROR
@@ -0,0 +1,70 @@
+# 🧩 Modo consolidado: una pila mezclada de PDFs contra los CSV de varias plantillas en una pasada
+from collections import Counter
+from dataclasses import dataclass, field
+
+from cartas.indice import UMBRAL_SIMILITUD
+from cartas.motor import comparar_campos, extraer_campos, medir, resumen
+from cartas.plantillas import PLANTILLAS, elegir_plantilla
+from cartas.revision import PLANTILLA_SIN_CSV, SIN_PLANTILLA, SIN_TEXTO
+
+# Para extraer_documentos(plantilla=...): cada PDF se lee una vez, con la lectura parcial de su plantilla
+TODAS = tuple(PLANTILLAS.values())
+
+
+@dataclass(slots=True)
+class Consolidado:
+    # clave de plantilla → Resultado, solo de las plantillas con CSV
+    resultados: dict = field(default_factory=dict)
+    # clave de plantilla → PDFs reconocidos como cartas de esa plantilla (tengan CSV o no)
+    clasificados: Counter = field(default_factory=Counter)
+    # (archivo, motivo, detalle) de los PDFs que no llegaron a ninguna plantilla
+    omitidos: list = field(default_factory=list)
+    pdfs: int = 0
+
+
+def comparar_consolidado(dfs, documentos, plantillas=TODAS, instrumentacion=None, umbral=UMBRAL_SIMILITUD):
+    # `dfs`: clave de plantilla → df ya preparado; `documentos`: (nombre, texto) como los de
+    # extraer_documentos. Cada texto se clasifica por ancla y frase distintiva entre todas las
+    # `plantillas` (aunque no tengan CSV, para no confundir cartas que comparten ancla), se
+    # reduce a sus campos y se descarta; al final cada plantilla compara sus lecturas de una vez
+    consolidado = Consolidado()
+    por_clave = {plantilla.clave: plantilla for plantilla in plantillas}
+    lecturas = {clave: [] for clave in dfs}
+    for nombre_archivo, texto in documentos:
+        consolidado.pdfs += 1
+        motivo = getattr(texto, "motivo", None)
+        if motivo:
+            consolidado.omitidos.append((nombre_archivo, motivo, texto.detalle))
+            continue
+        if not texto.strip():
+            consolidado.omitidos.append((nombre_archivo, SIN_TEXTO, ""))
+            continue
+        with medir(instrumentacion, "clasificacion", nombre_archivo):
+            plantilla = elegir_plantilla(texto, plantillas)
+        if plantilla is None:
+            consolidado.omitidos.append((nombre_archivo, SIN_PLANTILLA, ""))
+            continue
+        consolidado.clasificados[plantilla.clave] += 1
+        if plantilla.clave not in dfs:
+            consolidado.omitidos.append((nombre_archivo, PLANTILLA_SIN_CSV, plantilla.titulo))
+            continue
+        with medir(instrumentacion, "regex", nombre_archivo):
+            nombre_pdf, datos = extraer_campos(texto, plantilla)
+        lecturas[plantilla.clave].append((nombre_archivo, nombre_pdf, datos))
+
+    for clave, df in dfs.items():
+        consolidado.resultados[clave] = comparar_campos(df, lecturas[clave], por_clave[clave],
+                                                        instrumentacion=instrumentacion, umbral=umbral)
+    return consolidado
+
+
+def resumen_consolidado(consolidado):
+    return {
+        "pdfs": consolidado.pdfs,
+        "clasificados": dict(consolidado.clasificados),
+        "plantillas": {clave: resumen(resultado, consolidado.clasificados[clave])
+                       for clave, resultado in consolidado.resultados.items()},
+        "omitidos_por_motivo": dict(Counter(motivo for _, motivo, _ in consolidado.omitidos)),
+        "omitidos": [{"pdf": pdf, "motivo": motivo, "detalle": detalle}
+                     for pdf, motivo, detalle in consolidado.omitidos],
+    }
@@ -0,0 +1,55 @@
+# 📈 Pico de memoria residente (RSS) por ejecución, para dimensionar contenedores
+import re
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def reiniciar_pico():
+    # En Linux, escribir "5" en clear_refs pone el pico (VmHWM) al RSS actual; False si no se puede
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _mb(maxrss):
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    return maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def pico_proceso_mb():
+    try:
+        with open("/proc/self/status") as f:
+            return int(re.search(r"VmHWM:\s+(\d+)", f.read()).group(1)) / 1024
+    except (OSError, AttributeError):
+        return _mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) if resource is not None else None
+
+
+def pico_workers_mb():
+    # El mayor pico entre los procesos hijos ya terminados (el pool se cierra al final de cada
+    # extracción); no se puede reiniciar, así que cubre todas las ejecuciones del proceso
+    if resource is None:
+        return None
+    return _mb(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) or None
+
+
+class MedicionRSS:
+    # Se crea al empezar la ejecución. En la interfaz el proceso es compartido: si otra sesión
+    # valida a la vez, su memoria entra en el mismo pico
+    def __init__(self):
+        self.reiniciado = reiniciar_pico()
+
+    def resumen(self):
+        proceso, workers = pico_proceso_mb(), pico_workers_mb()
+        return {
+            "rss_pico_mb": round(proceso, 1) if proceso is not None else None,
+            "rss_pico_worker_mb": round(workers, 1) if workers is not None else None,
+            # Sin reinicio, el pico del proceso es el de toda su vida y no solo el de esta ejecución
+            "solo_esta_ejecucion": self.reiniciado,
+        }
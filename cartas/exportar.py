@@ -0,0 +1,117 @@
+# 💾 Exportación a Excel en una sola pasada (openpyxl en modo write-only)
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from cartas.motor import resumen
+from cartas.plantillas import texto_centavos, textos_csv
+
+RED_FILL = PatternFill(start_color="FF9999", end_color="FF9999", fill_type="solid")
+BLOQUE = 1000
+HOJA_OMITIDOS = {
+    "es": ("Omitidos", ["PDF", "Motivo", "Detalle"]),
+    "en": ("Skipped", ["PDF", "Reason", "Detail"]),
+}
+HOJA_RESUMEN = "Resumen"
+COLUMNAS_RESUMEN = ["Plantilla", "PDFs", "Procesados", "Sin coincidencia", "Filas con errores", "Omitidos"]
+COLUMNAS_OMITIDOS_CONSOLIDADO = ["PDF", "Plantilla", "Motivo", "Detalle"]
+
+
+def _valor(valor):
+    return None if pd.isna(valor) else valor
+
+
+def filas_exportar(resultado):
+    # Genera (valores, columnas con error) por fila procesada, leyendo el df por bloques;
+    # origen, notas y errores salen del resultado en la misma posición, así una fila del CSV
+    # emparejada con dos PDFs muestra en cada copia los errores de su propio PDF
+    df = resultado.df
+    campos = resultado.plantilla.columnas[1:]
+    posiciones = df.index.get_indexer(resultado.procesados)
+    for inicio in range(0, len(posiciones), BLOQUE):
+        bloque = posiciones[inicio:inicio + BLOQUE]
+        filas = df.iloc[bloque]
+        for campo in resultado.plantilla.campos:
+            # Los importes, en centavos, se escriben como el texto limpio del CSV
+            filas[campo.columna] = texto_centavos(filas[campo.columna], campo.decimales,
+                                                  textos_csv(df, campo.columna))
+        filas = filas.itertuples(index=False, name=None)
+        extra = zip(resultado.origenes[inicio:inicio + BLOQUE], resultado.notas[inicio:inicio + BLOQUE],
+                    resultado.estado[inicio:inicio + BLOQUE])
+        for valores, (origen, notas, estado) in zip(filas, extra):
+            errores = [campo for j, campo in enumerate(campos) if estado >> j & 1] if estado else ()
+            yield valores + (origen, notas), errores
+
+
+def encabezado(ws, columnas):
+    celdas = []
+    for col in columnas:
+        celda = WriteOnlyCell(ws, value=col)
+        celda.font = Font(bold=True)
+        celdas.append(celda)
+    ws.append(celdas)
+
+
+def escribir_hoja(ws, resultado):
+    plantilla = resultado.plantilla
+    columnas = list(resultado.df.columns) + [plantilla.columna_origen, plantilla.columna_notas]
+    posicion = {col: i for i, col in enumerate(columnas)}
+    encabezado(ws, columnas)
+    for valores, errores in filas_exportar(resultado):
+        fila = [_valor(v) for v in valores]
+        for col in errores:
+            celda = WriteOnlyCell(ws, value=fila[posicion[col]])
+            celda.fill = RED_FILL
+            fila[posicion[col]] = celda
+        ws.append(fila)
+
+
+def guardar(wb):
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def exportar_excel(resultado):
+    plantilla = resultado.plantilla
+    wb = Workbook(write_only=True)
+    escribir_hoja(wb.create_sheet(), resultado)
+
+    if resultado.omitidos:
+        # Conciliación: cada archivo que no llegó a compararse, con su motivo
+        titulo, columnas_omitidos = HOJA_OMITIDOS[plantilla.idioma]
+        ws = wb.create_sheet(titulo)
+        encabezado(ws, columnas_omitidos)
+        for omitido in resultado.omitidos:
+            ws.append(list(omitido))
+    return guardar(wb)
+
+
+def exportar_consolidado(consolidado):
+    # Un libro: hoja de resumen, una hoja por plantilla con CSV y los omitidos de todas juntos
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(HOJA_RESUMEN)
+    encabezado(ws, COLUMNAS_RESUMEN)
+    for clave, resultado in consolidado.resultados.items():
+        datos = resumen(resultado, consolidado.clasificados[clave])
+        ws.append([resultado.plantilla.titulo, datos["pdfs"], datos["procesados"], datos["sin_coincidencia"],
+                   datos["filas_con_errores"], len(resultado.omitidos)])
+    # Lo que no llegó a ninguna plantilla: rechazados, sin ancla reconocible o de una plantilla sin CSV
+    ws.append(["Sin plantilla o sin CSV", len(consolidado.omitidos), None, None, None, len(consolidado.omitidos)])
+
+    for resultado in consolidado.resultados.values():
+        escribir_hoja(wb.create_sheet(resultado.plantilla.titulo[:31]), resultado)
+
+    omitidos = [(pdf, "", motivo, detalle) for pdf, motivo, detalle in consolidado.omitidos]
+    for resultado in consolidado.resultados.values():
+        omitidos += [(pdf, resultado.plantilla.titulo, motivo, detalle)
+                     for pdf, motivo, detalle in resultado.omitidos]
+    if omitidos:
+        ws = wb.create_sheet(HOJA_OMITIDOS["es"][0])
+        encabezado(ws, COLUMNAS_OMITIDOS_CONSOLIDADO)
+        for omitido in omitidos:
+            ws.append(list(omitido))
+    return guardar(wb)
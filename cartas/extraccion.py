@@ -0,0 +1,168 @@
+# ⚙️ Extracción de texto en paralelo con un pool de procesos
+import os
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from cartas.cache import clave_texto, extraer_texto, huella, leer_bytes, leer_paginas
+from cartas.extractores import extractor_por_defecto, obtener_extractor
+from cartas.revision import ERROR_EXTRACCION, Rechazo, abrir_pdf, revisar_bytes
+
+
+def workers_por_defecto():
+    return int(os.environ.get("CARTAS_WORKERS", os.cpu_count() or 1))
+
+
+def nombre_archivo(archivo, i):
+    if hasattr(archivo, "name"):
+        return archivo.name
+    if isinstance(archivo, (str, os.PathLike)):
+        return str(archivo)
+    return f"#{i}"
+
+
+def extraer_texto_medido(datos, plantilla=None, memoria=False, extractor=None):
+    # Igual que extraer_texto, pero devuelve también tiempo y pico de memoria por etapa
+    propio = memoria and not tracemalloc.is_tracing()
+    if propio:
+        tracemalloc.start()
+    if memoria:
+        tracemalloc.reset_peak()
+    medidas = {}
+
+    inicio = time.perf_counter()
+    motor = obtener_extractor(extractor)
+    documento, texto = abrir_pdf(datos, motor.nombre)
+    paginas = motor.paginas(documento) if documento is not None else 0
+    medidas["revision"] = (time.perf_counter() - inicio, tracemalloc.get_traced_memory()[1] if memoria else 0)
+
+    if documento is not None:
+        if memoria:
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        try:
+            texto = leer_paginas(motor, documento, plantilla)
+        except Exception as e:
+            texto = Rechazo(ERROR_EXTRACCION, str(e))
+        finally:
+            motor.cerrar(documento)
+        medidas["extract_text"] = (time.perf_counter() - inicio, tracemalloc.get_traced_memory()[1] if memoria else 0)
+    if propio:
+        tracemalloc.stop()
+    return texto, paginas, medidas
+
+
+def extraer_documentos(documentos, cache=None, workers=None, progreso=None, contexto=None, instrumentacion=None,
+                       plantilla=None, total=None, huellas=None, extractor=None, en_vuelo=None):
+    # Genera (nombre, texto) en el mismo orden que `documentos`, pares (nombre, archivo) que pueden
+    # venir de un generador (miembros de un ZIP). Se consumen a medida que hay hueco: como mucho
+    # `en_vuelo` PDFs leídos y sin entregar (por defecto 2 × workers; con `workers` en el modo de
+    # bajo consumo), así que la memoria depende de los workers y no del tamaño del lote.
+    # Los PDFs viajan al pool como bytes; nunca se envía el UploadedFile.
+    # Con `plantilla`, cada PDF se lee solo hasta encontrar todos sus campos.
+    # Si se pasa el dict `huellas`, se llena con nombre → SHA-256 del PDF.
+    # `extractor` elige el motor de texto por nombre (None = el más rápido instalado).
+    # Con `total` None (un TAR) `progreso` recibe None, y al final una vez más con el total real
+    workers = workers_por_defecto() if workers is None else workers
+    extractor = extractor or extractor_por_defecto()
+    hechos = 0
+
+    if instrumentacion is not None:
+        tarea, extra = extraer_texto_medido, (plantilla, instrumentacion.memoria, extractor)
+    else:
+        tarea, extra = extraer_texto, (plantilla, extractor)
+
+    def preparar(nombre, archivo):
+        if isinstance(archivo, Rechazo):
+            # Miembro de un ZIP/TAR rechazado sin leerlo (demasiado grande)
+            if huellas is not None:
+                huellas[nombre] = None
+            return None, None, archivo
+        inicio = time.perf_counter()
+        datos = leer_bytes(archivo)
+        if huellas is not None:
+            huellas[nombre] = huella(datos)
+        # Lo que ya se sabe inútil (vacío, enorme, no PDF) ni siquiera viaja al pool
+        rechazo = revisar_bytes(datos)
+        if rechazo is not None:
+            return datos, None, rechazo
+        clave = clave_texto(datos, plantilla, extractor) if cache is not None else None
+        texto = cache.obtener(clave) if cache is not None else None
+        if texto is not None and instrumentacion is not None:
+            instrumentacion.registrar("cache", time.perf_counter() - inicio, nombre)
+        return datos, clave, texto
+
+    def terminar(nombre, clave, salida):
+        if instrumentacion is not None:
+            texto, paginas, medidas = salida
+            for etapa, (segundos, pico) in medidas.items():
+                instrumentacion.registrar(etapa, segundos, nombre, pico, paginas)
+        else:
+            texto = salida
+        if cache is not None and not isinstance(texto, Rechazo):
+            cache.guardar(clave, texto)
+        return texto
+
+    def entregar(nombre, clave, texto):
+        nonlocal hechos
+        if isinstance(texto, Future):
+            texto = terminar(nombre, clave, texto.result())
+        hechos += 1
+        if progreso:
+            progreso(hechos, total)
+        return nombre, texto
+
+    def terminar_progreso():
+        if progreso and total is None and hechos:
+            progreso(hechos, hechos)
+
+    if workers <= 1 or (total is not None and total <= 1):
+        for nombre, archivo in documentos:
+            datos, clave, texto = preparar(nombre, archivo)
+            if texto is None:
+                texto = terminar(nombre, clave, tarea(datos, *extra))
+            # Los bytes no esperan en el generador mientras el consumidor procesa el texto
+            del datos
+            yield entregar(nombre, clave, texto)
+        terminar_progreso()
+        return
+
+    limite = max(en_vuelo or 2 * workers, 1)
+    cola = deque()  # (nombre, clave, texto o futuro) en orden de entrada
+    pool = None
+    try:
+        for nombre, archivo in documentos:
+            datos, clave, texto = preparar(nombre, archivo)
+            if texto is None:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=min(workers, total or workers, limite), mp_context=contexto)
+                texto = pool.submit(tarea, datos, *extra)
+            del datos
+            cola.append((nombre, clave, texto))
+            # Sale todo lo que ya está listo en cabeza; si la cola está llena, se espera a la cabeza
+            while cola and (len(cola) >= limite or not isinstance(cola[0][2], Future) or cola[0][2].done()):
+                yield entregar(*cola.popleft())
+        while cola:
+            yield entregar(*cola.popleft())
+        terminar_progreso()
+    finally:
+        # Si el consumidor deja de iterar (cancelación), lo que no empezó no se ejecuta
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def extraer_lote(archivos, cache=None, workers=None, progreso=None, contexto=None, instrumentacion=None, nombres=None,
+                 plantilla=None, extractor=None):
+    # Solo los textos, en el mismo orden que `archivos`.
+    # `nombres` etiqueta cada archivo en la instrumentación (por defecto su .name o ruta)
+    if nombres is None:
+        nombres = [nombre_archivo(archivo, i) for i, archivo in enumerate(archivos)]
+    documentos = extraer_documentos(zip(nombres, archivos), cache, workers=workers, progreso=progreso,
+                                    contexto=contexto, instrumentacion=instrumentacion, plantilla=plantilla,
+                                    total=len(archivos), extractor=extractor)
+    try:
+        for _, texto in documentos:
+            yield texto
+    finally:
+        documentos.close()
@@ -0,0 +1,216 @@
+# 📑 Extractores de texto intercambiables: PyPDF2 siempre; pypdfium2 y pdfminer.six si están instalados
+import importlib.util
+import io
+import os
+import threading
+from abc import ABC, abstractmethod
+
+# Orden de preferencia al elegir automáticamente: el primero instalado gana. pdfminer.six da los
+# mismos campos pero su análisis de líneas es varias veces más lento que PyPDF2: solo si se pide
+PREFERENCIA = ("pypdfium2", "pypdf2", "pdfminer")
+POR_DEFECTO = "pypdf2"
+
+
+class PdfCifrado(Exception):
+    pass
+
+
+def tiene_fuentes(recursos, profundidad=2):
+    # Una página con texto declara fuentes en sus recursos o en los de un formulario (XObject /Form)
+    recursos = recursos.get_object() if recursos is not None else None
+    if not recursos:
+        return False
+    if recursos.get("/Font"):
+        return True
+    if profundidad:
+        xobjetos = recursos.get("/XObject")
+        for xobjeto in (xobjetos.get_object().values() if xobjetos is not None else ()):
+            xobjeto = xobjeto.get_object()
+            if xobjeto.get("/Subtype") == "/Form" and tiene_fuentes(xobjeto.get("/Resources"), profundidad - 1):
+                return True
+    return False
+
+
+def normalizar_pagina(texto):
+    # Mismo formato que PyPDF2: saltos "\n" y cada página terminada en salto de línea,
+    # para que la última línea de una página no se pegue a la primera de la siguiente
+    texto = texto.replace("\r\n", "\n").replace("\r", "\n").replace("\x0c", "")
+    return texto if not texto or texto.endswith("\n") else texto + "\n"
+
+
+class Extractor(ABC):
+    # abrir() lanza PdfCifrado si no se abre con contraseña vacía y cualquier otra excepción
+    # si el PDF está dañado; paginas(), texto() y capa_texto() trabajan sobre el documento abierto.
+    # Un motor que no implemente abrir(), paginas() o texto() no llega a instanciarse
+    nombre = None
+    modulo = None
+
+    @classmethod
+    def disponible(cls):
+        return cls.modulo is None or importlib.util.find_spec(cls.modulo) is not None
+
+    @abstractmethod
+    def abrir(self, datos):
+        pass
+
+    @abstractmethod
+    def paginas(self, documento):
+        pass
+
+    @abstractmethod
+    def texto(self, documento, i):
+        pass
+
+    def capa_texto(self, documento, paginas):
+        # Sin una comprobación barata, se asume que hay texto y lo decide la extracción
+        return True
+
+    def cerrar(self, documento):
+        pass
+
+
+class ExtractorPyPDF2(Extractor):
+    nombre = "pypdf2"
+
+    def abrir(self, datos):
+        from PyPDF2 import PdfReader
+        reader = PdfReader(io.BytesIO(datos))
+        # Muchas cartas solo traen permisos de propietario: se abren con contraseña vacía
+        if reader.is_encrypted and not reader.decrypt(""):
+            raise PdfCifrado()
+        return reader
+
+    def paginas(self, documento):
+        return len(documento.pages)
+
+    def texto(self, documento, i):
+        return documento.pages[i].extract_text() or ""
+
+    def capa_texto(self, documento, paginas):
+        return any(tiene_fuentes(documento.pages[i].get("/Resources")) for i in range(paginas))
+
+
+class ExtractorPdfium(Extractor):
+    # PDFium no admite llamadas concurrentes dentro de un mismo proceso: un lock lo serializa
+    # entre hilos (trabajos en segundo plano); el paralelismo real viene del pool de procesos
+    nombre = "pypdfium2"
+    modulo = "pypdfium2"
+    _lock = threading.RLock()
+
+    def abrir(self, datos):
+        import pypdfium2 as pdfium
+        with self._lock:
+            try:
+                return pdfium.PdfDocument(datos)
+            except pdfium.PdfiumError as e:
+                if "password" in str(e).lower():
+                    raise PdfCifrado() from e
+                raise
+
+    def paginas(self, documento):
+        with self._lock:
+            return len(documento)
+
+    def texto(self, documento, i):
+        with self._lock:
+            pagina = documento[i]
+            textos = pagina.get_textpage()
+            try:
+                return normalizar_pagina(textos.get_text_range())
+            finally:
+                textos.close()
+                pagina.close()
+
+    def capa_texto(self, documento, paginas):
+        with self._lock:
+            for i in range(paginas):
+                pagina = documento[i]
+                textos = pagina.get_textpage()
+                caracteres = textos.count_chars()
+                textos.close()
+                pagina.close()
+                if caracteres:
+                    return True
+        return False
+
+    def cerrar(self, documento):
+        with self._lock:
+            documento.close()
+
+
+class ExtractorPdfminer(Extractor):
+    # Sin LAParams pdfminer no emite saltos de línea y las anclas de las plantillas son por línea,
+    # así que se usa el análisis de líneas por defecto (sin detección de columnas ni figuras)
+    nombre = "pdfminer"
+    modulo = "pdfminer"
+
+    def abrir(self, datos):
+        from pdfminer.pdfdocument import PDFDocument, PDFPasswordIncorrect
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+        try:
+            documento = PDFDocument(PDFParser(io.BytesIO(datos)))
+        except PDFPasswordIncorrect as e:
+            raise PdfCifrado() from e
+        return list(PDFPage.create_pages(documento))
+
+    def paginas(self, documento):
+        return len(documento)
+
+    def texto(self, documento, i):
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        salida = io.StringIO()
+        recursos = PDFResourceManager()
+        with TextConverter(recursos, salida, laparams=LAParams(all_texts=False)) as conversor:
+            PDFPageInterpreter(recursos, conversor).process_page(documento[i])
+        return normalizar_pagina("\n".join(linea for linea in salida.getvalue().splitlines() if linea.strip()))
+
+    def capa_texto(self, documento, paginas):
+        return any(self._tiene_fuentes(documento[i].resources) for i in range(paginas))
+
+    def _tiene_fuentes(self, recursos, profundidad=2):
+        # Lo mismo que tiene_fuentes() con los objetos de pdfminer
+        from pdfminer.pdftypes import resolve1
+        recursos = resolve1(recursos)
+        if not isinstance(recursos, dict):
+            return False
+        if resolve1(recursos.get("Font")):
+            return True
+        if profundidad:
+            for xobjeto in (resolve1(recursos.get("XObject")) or {}).values():
+                xobjeto = resolve1(xobjeto)
+                atributos = getattr(xobjeto, "attrs", {})
+                if getattr(resolve1(atributos.get("Subtype")), "name", None) == "Form" and \
+                        self._tiene_fuentes(atributos.get("Resources"), profundidad - 1):
+                    return True
+        return False
+
+
+EXTRACTORES = {clase.nombre: clase for clase in (ExtractorPyPDF2, ExtractorPdfium, ExtractorPdfminer)}
+_instancias = {}
+
+
+def disponibles():
+    return [nombre for nombre in PREFERENCIA if EXTRACTORES[nombre].disponible()]
+
+
+def extractor_por_defecto():
+    # CARTAS_EXTRACTOR fuerza uno concreto; si no, el más rápido de los instalados
+    nombre = os.environ.get("CARTAS_EXTRACTOR")
+    if nombre:
+        return nombre
+    return next(iter(disponibles()), POR_DEFECTO)
+
+
+def obtener_extractor(nombre=None):
+    # Por nombre para que viaje al pool de procesos como un simple str
+    nombre = nombre or extractor_por_defecto()
+    if nombre not in EXTRACTORES:
+        raise ValueError(f"Extractor desconocido: {nombre}. Opciones: {', '.join(EXTRACTORES)}")
+    if not EXTRACTORES[nombre].disponible():
+        raise ValueError(f"El extractor {nombre} no está instalado")
+    if nombre not in _instancias:
+        _instancias[nombre] = EXTRACTORES[nombre]()
+    return _instancias[nombre]
@@ -0,0 +1,40 @@
+# 🔄 Revalidación incremental: solo se vuelven a analizar las cartas que cambiaron
+from cartas.cache import huella
+
+
+class MemoriaValidacion:
+    # La comparación de campos es vectorial y se recalcula entera; lo caro de repetir es
+    # buscar nombre y campos en el texto, así que eso es lo que se reutiliza entre ejecuciones
+    def __init__(self):
+        self.campos = {}      # huella del texto del PDF → (nombre, datos extraídos)
+        self.anterior = None  # nombre → campos con error en la ejecución anterior
+        self.reutilizados = 0
+        self._campos = {}
+
+    def iniciar(self):
+        self._campos = {}
+        self.reutilizados = 0
+
+    def campos_pdf(self, texto, extraer):
+        clave = huella(texto.encode("utf-8"))
+        campos = self.campos.get(clave)
+        if campos is None:
+            campos = extraer(texto)
+        else:
+            self.reutilizados += 1
+        self._campos[clave] = campos
+        return campos
+
+    def cerrar(self, actual):
+        # Guarda solo lo usado en esta ejecución y devuelve los cambios frente a la anterior
+        self.campos, self._campos = self._campos, {}
+        cambios = {"corregidos": [], "nuevos": []}
+        if self.anterior is not None:
+            for nombre, errores in actual.items():
+                previos = self.anterior.get(nombre)
+                if previos is None:
+                    continue
+                cambios["corregidos"] += [(nombre, campo) for campo in previos if campo not in errores]
+                cambios["nuevos"] += [(nombre, campo) for campo in errores if campo not in previos]
+        self.anterior = actual
+        return cambios
@@ -0,0 +1,116 @@
+# 🔎 Índice nombre → fila del CSV, construido una sola vez por carga
+import re
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+
+NO_ALFANUMERICO = re.compile(r"[\W_]")
+# Similitud mínima por defecto para aceptar un nombre aproximado (1.0 = solo coincidencia exacta)
+UMBRAL_SIMILITUD = 0.9
+# Ventaja mínima del mejor candidato sobre el segundo; si no la hay, el nombre es ambiguo
+MARGEN_SIMILITUD = 0.02
+# Candidatos que se comparan como mínimo; se amplía con los empatados en votos hasta MAX_EMPATADOS
+MAX_CANDIDATOS = 50
+MAX_EMPATADOS = 2000
+LARGO_PREFIJO = 3
+
+
+def normalizar_nombre(nombre):
+    # Sin acentos, sin signos, en mayúsculas y con un solo espacio entre palabras
+    nombre = str(nombre)
+    if not nombre.isascii():
+        nombre = "".join(c for c in unicodedata.normalize("NFKD", nombre) if not unicodedata.combining(c))
+    return " ".join(NO_ALFANUMERICO.sub(" ", nombre).upper().split())
+
+
+def claves_bloque(normalizado):
+    # Cada palabra y su prefijo: "PERES" y "PEREZ" caen en el mismo bloque por "PER"
+    claves = set()
+    for palabra in normalizado.split():
+        claves.add(palabra)
+        if len(palabra) > LARGO_PREFIJO:
+            claves.add(palabra[:LARGO_PREFIJO] + "*")
+    return claves
+
+
+class NombreDuplicado(KeyError):
+    def __init__(self, nombre, filas):
+        super().__init__(nombre)
+        self.nombre = nombre
+        self.filas = filas
+
+
+class IndiceNombres:
+    # La similitud es la de difflib sin reordenar palabras: "CRUZ CASTILLO" y "CASTILLO CRUZ"
+    # son apellidos de personas distintas
+    def __init__(self, serie, umbral=UMBRAL_SIMILITUD):
+        self.umbral = umbral
+        self.filas = {}
+        self.duplicados = {}
+        self.bloques = {}  # clave de bloque → nombres normalizados que la contienen
+        for idx, nombre in serie.items():
+            nombre = normalizar_nombre(nombre)
+            if nombre in self.duplicados:
+                self.duplicados[nombre].append(idx)
+            elif nombre in self.filas:
+                self.duplicados[nombre] = [self.filas.pop(nombre), idx]
+            else:
+                self.filas[nombre] = idx
+                for clave in claves_bloque(nombre):
+                    self.bloques.setdefault(clave, []).append(nombre)
+
+    def __contains__(self, nombre):
+        nombre = normalizar_nombre(nombre)
+        return nombre in self.filas or nombre in self.duplicados
+
+    def __len__(self):
+        return len(self.filas) + len(self.duplicados)
+
+    def candidatos(self, nombre):
+        # Solo se compara contra los nombres que comparten más bloques con el buscado. Las claves van
+        # ordenadas: los empates en votos (y en similitud) se resuelven igual en cada ejecución
+        votos = Counter()
+        for clave in sorted(claves_bloque(nombre)):
+            votos.update(self.bloques.get(clave, ()))
+        orden = votos.most_common()
+        if len(orden) > MAX_CANDIDATOS:
+            corte = orden[MAX_CANDIDATOS - 1][1]
+            orden = [par for par in orden[:MAX_EMPATADOS] if par[1] >= corte]
+        return [candidato for candidato, _ in orden]
+
+    def aproximar(self, nombre):
+        # (mejor candidato, similitud, segunda mejor similitud); candidato None si no hay ninguno
+        mejor, puntaje, segundo = None, 0.0, 0.0
+        for candidato in self.candidatos(nombre):
+            comparador = SequenceMatcher(None, nombre, candidato)
+            # Cotas superiores baratas: si no superan al segundo, el candidato no cambia nada
+            if comparador.real_quick_ratio() <= segundo or comparador.quick_ratio() <= segundo:
+                continue
+            valor = comparador.ratio()
+            if valor > puntaje:
+                mejor, puntaje, segundo = candidato, valor, puntaje
+            elif valor > segundo:
+                segundo = valor
+        return mejor, puntaje, segundo
+
+    def emparejar(self, nombre):
+        # (fila, confianza, nombre del CSV elegido). Fila None si no hay un nombre suficientemente
+        # parecido y sin ambigüedad; en ese caso la confianza y el nombre son los del mejor candidato
+        # descartado, la sugerencia para el usuario (la búsqueda aproximada no se repite).
+        # NombreDuplicado si el nombre elegido aparece en varias filas
+        nombre = normalizar_nombre(nombre)
+        if nombre in self.duplicados:
+            raise NombreDuplicado(nombre, self.duplicados[nombre])
+        if nombre in self.filas:
+            return self.filas[nombre], 1.0, nombre
+        mejor, puntaje, segundo = self.aproximar(nombre)
+        if (self.umbral is None or self.umbral >= 1.0 or mejor is None or puntaje < self.umbral
+                or puntaje - segundo < MARGEN_SIMILITUD):
+            return None, puntaje, mejor
+        if mejor in self.duplicados:
+            raise NombreDuplicado(mejor, self.duplicados[mejor])
+        return self.filas[mejor], puntaje, mejor
+
+    def buscar(self, nombre):
+        # None si el nombre no está en el CSV; NombreDuplicado si aparece en varias filas
+        return self.emparejar(nombre)[0]
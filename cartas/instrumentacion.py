@@ -0,0 +1,95 @@
+# 🩺 Instrumentación por etapa y por archivo: tiempo, número de llamadas y pico de memoria
+import io
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+COLUMNAS = ["archivo", "etapa", "llamadas", "segundos", "pico_bytes", "paginas"]
+
+
+class Instrumentacion:
+    def __init__(self, memoria=False):
+        # Con memoria=True se usa tracemalloc para el pico por etapa (más lento)
+        self.memoria = memoria
+        self.etapas = {}    # etapa → [llamadas, segundos, pico_bytes]
+        self.archivos = {}  # archivo → {"paginas": n, etapa: [llamadas, segundos, pico_bytes]}
+
+    def registrar(self, etapa, segundos, archivo=None, pico=0, paginas=None):
+        total = self.etapas.setdefault(etapa, [0, 0.0, 0])
+        total[0] += 1
+        total[1] += segundos
+        total[2] = max(total[2], pico)
+        if archivo is None:
+            return
+        por_archivo = self.archivos.setdefault(archivo, {"paginas": None})
+        if paginas is not None:
+            por_archivo["paginas"] = paginas
+        medida = por_archivo.setdefault(etapa, [0, 0.0, 0])
+        medida[0] += 1
+        medida[1] += segundos
+        medida[2] = max(medida[2], pico)
+
+    def unir(self, otra):
+        # Suma las mediciones de otra instancia (p. ej. la de un trabajo en segundo plano)
+        for etapa, (llamadas, segundos, pico) in otra.etapas.items():
+            total = self.etapas.setdefault(etapa, [0, 0.0, 0])
+            total[0] += llamadas
+            total[1] += segundos
+            total[2] = max(total[2], pico)
+        for archivo, medidas in otra.archivos.items():
+            destino = self.archivos.setdefault(archivo, {"paginas": None})
+            for etapa, medida in medidas.items():
+                if etapa == "paginas":
+                    destino["paginas"] = destino["paginas"] or medida
+                    continue
+                total = destino.setdefault(etapa, [0, 0.0, 0])
+                total[0] += medida[0]
+                total[1] += medida[1]
+                total[2] = max(total[2], medida[2])
+
+    @contextmanager
+    def medir(self, etapa, archivo=None):
+        propio = self.memoria and not tracemalloc.is_tracing()
+        if propio:
+            tracemalloc.start()
+        if self.memoria:
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            pico = tracemalloc.get_traced_memory()[1] if self.memoria else 0
+            if propio:
+                tracemalloc.stop()
+            self.registrar(etapa, segundos, archivo, pico)
+
+    def tabla_etapas(self):
+        return pd.DataFrame(
+            [(etapa, llamadas, segundos, pico) for etapa, (llamadas, segundos, pico) in self.etapas.items()],
+            columns=["etapa", "llamadas", "segundos", "pico_bytes"],
+        ).sort_values("segundos", ascending=False, ignore_index=True)
+
+    def tabla_archivos(self):
+        filas = []
+        for archivo, medidas in self.archivos.items():
+            for etapa, medida in medidas.items():
+                if etapa != "paginas":
+                    filas.append((archivo, etapa, *medida, medidas["paginas"]))
+        return pd.DataFrame(filas, columns=COLUMNAS)
+
+    def mas_lentos(self, n=10):
+        filas = [
+            (archivo, sum(m[1] for etapa, m in medidas.items() if etapa != "paginas"), medidas["paginas"])
+            for archivo, medidas in self.archivos.items()
+        ]
+        filas.sort(key=lambda fila: fila[1], reverse=True)
+        return pd.DataFrame(filas[:n], columns=["archivo", "segundos", "paginas"])
+
+    def a_csv(self):
+        etapas = self.tabla_etapas().assign(archivo="", paginas=None)[COLUMNAS]
+        buffer = io.StringIO()
+        pd.concat([etapas, self.tabla_archivos()], ignore_index=True).to_csv(buffer, index=False)
+        return buffer.getvalue().encode("utf-8")
@@ -0,0 +1,201 @@
+# 🔁 Motor único de comparación PDF vs CSV, guiado por una Plantilla
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from cartas.indice import UMBRAL_SIMILITUD, IndiceNombres, NombreDuplicado
+from cartas.plantillas import (TEXTOS_CSV, a_centavos, comparar_columnas, extraer_datos, nombre_tras_ancla,
+                               texto_centavos, textos_csv, ubicar_ancla)
+from cartas.revision import CAMPOS_INCOMPLETOS, NO_EN_CSV, NOMBRE_DUPLICADO, SIN_NOMBRE, SIN_TEXTO
+
+NOTA = {
+    "es": "{campo}: En el EXCEL: {esperado}// En el PDF: {extraido}",
+    "en": "{campo}: In CSV: {esperado}// In PDF: {extraido}",
+}
+
+
+@dataclass(slots=True)
+class Resultado:
+    # Modelo columnar: el df del CSV no se copia ni se formatea; cada carta comparada es una
+    # posición en `procesados`, `estado`, `origenes`, `notas` y `confianza`. La tabla con ✅/❌
+    # y el Excel se derivan solo para las filas procesadas (VistaResultados, exportar_excel)
+    plantilla: object
+    df: object
+    errores_por_fila: dict = field(default_factory=dict)
+    procesados: list = field(default_factory=list)
+    # nombre → (filas del CSV, PDFs que lo usan); no se comparan contra ninguna fila
+    duplicados: dict = field(default_factory=dict)
+    # Campos corregidos / nuevos errores frente a la ejecución anterior (modo incremental)
+    cambios: dict = field(default_factory=dict)
+    # Alineados con `procesados`: bit j encendido si el campo j de la plantilla no coincide
+    estado: object = None
+    origenes: list = field(default_factory=list)
+    notas: list = field(default_factory=list)
+    # Alineada con `procesados`: 1.0 si el nombre coincide al normalizarlo, menos si es aproximado
+    confianza: list = field(default_factory=list)
+    # (archivo, nombre en el PDF, nombre más parecido del CSV, similitud) de los PDFs sin fila
+    sin_emparejar: list = field(default_factory=list)
+    # archivo → (nombre en el PDF, datos extraídos) de todo PDF donde se encontró un nombre
+    extraidos: dict = field(default_factory=dict)
+    # (archivo, motivo, detalle) de cada archivo que no llegó a compararse; motivos en cartas.revision
+    omitidos: list = field(default_factory=list)
+
+
+def preparar_csv(df, plantilla):
+    # Nombres en mayúsculas; importes en centavos enteros (Int64, <NA> si la celda no es un número),
+    # así se interpretan una sola vez y se comparan sin redondeos de float. El texto de las celdas
+    # que no son número queda en df.attrs (textos_csv) para las notas y la exportación
+    columnas = plantilla.columnas
+    originales = {}
+    for col in columnas[1:]:
+        centavos = a_centavos(df[col])
+        perdidos = centavos.isna().to_numpy() & df[col].notna().to_numpy()
+        if perdidos.any():
+            originales[col] = df[col][perdidos].astype(str).str.strip().to_dict()
+        df[col] = centavos
+    if originales:
+        df.attrs[TEXTOS_CSV] = originales
+    df[columnas[0]] = df[columnas[0]].astype(str).str.upper().str.strip()
+    return df
+
+
+def extraer_campos(texto, plantilla):
+    # El ancla se ubica una vez: da el nombre y el inicio de la ventana donde están los campos
+    inicio = ubicar_ancla(texto, plantilla)
+    nombre_pdf = nombre_tras_ancla(texto, inicio) if inicio is not None else None
+    if not nombre_pdf:
+        return None, None
+    return nombre_pdf.upper().strip(), extraer_datos(texto, plantilla, inicio)
+
+
+def leer_campos(documentos, plantilla, omitidos, memoria=None, instrumentacion=None):
+    # (nombre de archivo, nombre en el PDF, datos extraídos) por cada (nombre, texto); lo que no
+    # tiene texto va a `omitidos`. Cada texto se suelta en cuanto se leen sus campos
+    for nombre_archivo, texto in documentos:
+        motivo = getattr(texto, "motivo", None)
+        if motivo:
+            omitidos.append((nombre_archivo, motivo, texto.detalle))
+            continue
+        if not texto.strip():
+            omitidos.append((nombre_archivo, SIN_TEXTO, ""))
+            continue
+        with medir(instrumentacion, "regex", nombre_archivo):
+            if memoria is not None:
+                nombre_pdf, datos = memoria.campos_pdf(texto, lambda t: extraer_campos(t, plantilla))
+            else:
+                nombre_pdf, datos = extraer_campos(texto, plantilla)
+        yield nombre_archivo, nombre_pdf, datos
+
+
+def comparar_documentos(df, documentos, plantilla, indice=None, memoria=None, instrumentacion=None,
+                        umbral=UMBRAL_SIMILITUD):
+    # `documentos` es un iterable de (nombre de archivo, texto extraído); el df ya está preparado
+    omitidos = []
+    if memoria is not None:
+        memoria.iniciar()
+    lecturas = leer_campos(documentos, plantilla, omitidos, memoria, instrumentacion)
+    return comparar_campos(df, lecturas, plantilla, indice, memoria, instrumentacion, umbral, omitidos)
+
+
+def medir(instrumentacion, etapa, archivo=None):
+    return instrumentacion.medir(etapa, archivo) if instrumentacion is not None else nullcontext()
+
+
+def comparar_campos(df, lecturas, plantilla, indice=None, memoria=None, instrumentacion=None, umbral=UMBRAL_SIMILITUD,
+                    omitidos=None):
+    # `lecturas` es un iterable de (nombre de archivo, nombre en el PDF, datos extraídos), ya sea
+    # del texto de los PDFs o de extracciones guardadas. Primero se empareja cada PDF con su fila;
+    # después todos los campos de todas las filas se comparan de una vez con comparar_columnas.
+    # Con `memoria`, quien la usó para leer los campos ya llamó a memoria.iniciar(); aquí se cierra
+    campos = plantilla.columnas[1:]
+    if indice is None:
+        indice = IndiceNombres(df[plantilla.columna_nombre], umbral)
+    resultado = Resultado(plantilla, df)
+    if omitidos is not None:
+        resultado.omitidos = omitidos  # se sigue llenando mientras se consumen las lecturas
+    emparejados = []  # (fila, nombre de archivo, nombre en el PDF, datos extraídos, confianza)
+
+    for nombre_archivo, nombre_pdf, datos in lecturas:
+        if not nombre_pdf:
+            resultado.omitidos.append((nombre_archivo, SIN_NOMBRE, ""))
+            continue
+        resultado.extraidos[nombre_archivo] = (nombre_pdf, datos)
+        try:
+            idx, confianza, sugerencia = indice.emparejar(nombre_pdf)
+        except NombreDuplicado as e:
+            resultado.duplicados.setdefault(e.nombre, (e.filas, []))[1].append(nombre_archivo)
+            resultado.omitidos.append((nombre_archivo, NOMBRE_DUPLICADO, e.nombre))
+            continue
+        if idx is None:
+            resultado.sin_emparejar.append((nombre_archivo, nombre_pdf, sugerencia, confianza))
+            resultado.omitidos.append((nombre_archivo, NO_EN_CSV, nombre_pdf))
+            continue
+        if not datos:
+            resultado.omitidos.append((nombre_archivo, CAMPOS_INCOMPLETOS, nombre_pdf))
+            continue
+        emparejados.append((idx, nombre_archivo, nombre_pdf, datos, confianza))
+
+    with medir(instrumentacion, "comparacion"):
+        filas = [idx for idx, _, _, _, _ in emparejados]
+        extraidos = np.array([datos for _, _, _, datos, _ in emparejados], dtype=object).reshape(len(filas), len(campos))
+        esperados = df.loc[filas, campos]
+        coincide = comparar_columnas(extraidos, esperados, plantilla)
+        resultado.origenes = [nombre for _, nombre, _, _, _ in emparejados]
+        resultado.confianza = [confianza for _, _, _, _, confianza in emparejados]
+        pesos = np.left_shift(np.uint32(1), np.arange(len(campos), dtype=np.uint32))
+        resultado.estado = ((~coincide).astype(np.uint32) * pesos).sum(axis=1, dtype=np.uint32)
+
+    with medir(instrumentacion, "notas"):
+        # Una nota por carta comparada, solo con sus campos en error y en el orden de columnas del CSV
+        nota = NOTA[plantilla.idioma]
+        orden = sorted(range(len(campos)), key=lambda j: df.columns.get_loc(campos[j]))
+        errores_por_nombre = {}
+        textos = {}  # campo → importes del CSV como texto, solo si algún PDF falla en ese campo
+        for i, (idx, _, nombre_pdf, datos, _) in enumerate(emparejados):
+            if not resultado.estado[i]:
+                # Si otro PDF de la misma fila ya falló, su error se mantiene
+                resultado.notas.append("")
+                errores_por_nombre.setdefault(nombre_pdf, [])
+                continue
+            errores = [j for j in orden if not coincide[i, j]]
+            for j in errores:
+                if j not in textos:
+                    textos[j] = texto_centavos(esperados.iloc[:, j], plantilla.campos[j].decimales,
+                                               textos_csv(df, campos[j]))
+            resultado.notas.append(" | ".join(
+                nota.format(campo=campos[j], esperado=textos[j][i], extraido=datos[j]) for j in errores))
+            # Varios PDFs de la misma fila: la fila acumula los campos en error de todos
+            previos = set(resultado.errores_por_fila.get(idx, ())) | set(errores_por_nombre.get(nombre_pdf, ()))
+            fila = [campos[j] for j in orden if not coincide[i, j] or campos[j] in previos]
+            errores_por_nombre[nombre_pdf] = resultado.errores_por_fila[idx] = fila
+    resultado.procesados = filas
+    if memoria is not None:
+        resultado.cambios = memoria.cerrar(errores_por_nombre)
+    return resultado
+
+
+def resumen(resultado, total_pdfs):
+    errores_por_campo = {campo: 0 for campo in resultado.plantilla.columnas[1:]}
+    for errores in resultado.errores_por_fila.values():
+        for campo in errores:
+            errores_por_campo[campo] += 1
+    return {
+        "plantilla": resultado.plantilla.clave,
+        "pdfs": total_pdfs,
+        "procesados": len(resultado.procesados),
+        # Cada carta leída se procesa o se omite; en modo combinado `total_pdfs` cuenta archivos, no cartas
+        "sin_coincidencia": len(resultado.omitidos) - sum(len(pdfs) for _, pdfs in resultado.duplicados.values()),
+        "filas_con_errores": len(resultado.errores_por_fila),
+        "errores_por_campo": errores_por_campo,
+        "duplicados": {nombre: {"filas": [int(f) for f in filas], "pdfs": pdfs}
+                       for nombre, (filas, pdfs) in resultado.duplicados.items()},
+        "aproximados": [{"pdf": pdf, "fila": int(fila), "confianza": round(confianza, 3)}
+                        for fila, pdf, confianza in zip(resultado.procesados, resultado.origenes, resultado.confianza)
+                        if confianza < 1.0],
+        "no_emparejados": [{"pdf": pdf, "nombre": nombre, "sugerencia": sugerencia, "similitud": round(similitud, 3)}
+                           for pdf, nombre, sugerencia, similitud in resultado.sin_emparejar],
+        "omitidos_por_motivo": dict(Counter(motivo for _, motivo, _ in resultado.omitidos)),
+        "omitidos": [{"pdf": pdf, "motivo": motivo, "detalle": detalle} for pdf, motivo, detalle in resultado.omitidos],
+    }
@@ -0,0 +1,365 @@
+# 📝 Plantillas declarativas de cartas: ancla del nombre, campos y columnas del CSV
+import re
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+TABLA_LIMPIEZA = str.maketrans("", "", ",\xa0\u200b %")
+# Una línea con su salto, con los mismos separadores que str.splitlines()
+LINEA = re.compile(r"[^\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]*(?:\r\n|[\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029])?")
+# Lo que reemplaza a {anio} en los patrones cuando la plantilla no fija un año
+CUALQUIER_ANIO = r"20\d{2}"
+
+
+def limpiar(valor):
+    return str(valor).replace(",", "").replace("\xa0", "").replace("\u200b", "").replace(" ", "").replace("%", "").strip()
+
+
+def limpiar_columna(serie):
+    # Igual que limpiar() celda a celda, pero con operaciones de cadena de pandas
+    return serie.astype(str).fillna("nan").str.translate(TABLA_LIMPIEZA).str.strip()
+
+
+# Clave de df.attrs con el texto de las celdas de importe que no son un número
+TEXTOS_CSV = "textos_csv"
+
+
+def _centavos(numeros):
+    # (centavos int64, válidos): fuera de ±2**53 un float ya no representa cada centavo (y descarta NaN e inf)
+    centavos = np.round(np.asarray(numeros, dtype="float64") * 100)
+    valido = np.abs(centavos) < 2 ** 53
+    return np.where(valido, centavos, 0).astype(np.int64), valido
+
+
+def a_centavos(valores):
+    # Importes como centavos enteros (Int64), <NA> si no son un número. El texto se limpia como en
+    # limpiar(); las columnas ya numéricas (Parquet, Arrow, Excel) no pasan por texto
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object)
+    if not pd.api.types.is_numeric_dtype(serie.dtype) or pd.api.types.is_bool_dtype(serie.dtype):
+        serie = pd.to_numeric(limpiar_columna(serie), errors="coerce")
+    centavos, valido = _centavos(serie.astype("float64").to_numpy(na_value=np.nan))
+    return pd.Series(pd.arrays.IntegerArray(centavos, ~valido), index=serie.index)
+
+
+def textos_csv(df, columna):
+    # {fila: texto} de las celdas de `columna` que preparar_csv no pudo leer como número, o None
+    return df.attrs.get(TEXTOS_CSV, {}).get(columna)
+
+
+def texto_centavos(centavos, decimales=False, originales=None):
+    # Inverso de a_centavos para mostrar y exportar: siempre con dos decimales en campos con decimales,
+    # sin ellos si el importe es entero en los demás ("12576", "291862.60") y "" si falta. Con
+    # `originales` (textos_csv), una celda que no era número muestra su texto del CSV
+    centavos = pd.Series(centavos, dtype="Int64")
+    if centavos.empty:
+        return np.array([], dtype=object)
+    valido = centavos.notna().to_numpy()
+    crudo = centavos.to_numpy(dtype=np.int64, na_value=0)
+    enteros, resto = np.divmod(np.abs(crudo), 100)
+    base = np.where(crudo < 0, "-", "").astype(object) + enteros.astype(str).astype(object)
+    texto = base + "." + np.char.zfill(resto.astype(str), 2).astype(object)
+    if not decimales:
+        texto = np.where(resto == 0, base, texto)
+    texto = np.where(valido, texto, "").astype(object)
+    if originales:
+        for k in np.flatnonzero(~valido):
+            texto[k] = originales.get(centavos.index[k], "")
+    return texto
+
+
+@dataclass(frozen=True)
+class Campo:
+    columna: str
+    patron: str
+    decimales: bool = False
+    # Tolerancia absoluta (None = la de la plantilla) y relativa al valor del CSV
+    tolerancia: float = None
+    tolerancia_relativa: float = 0.0
+
+
+@dataclass(frozen=True)
+class Plantilla:
+    clave: str
+    titulo: str
+    idioma: str
+    ancla: str
+    columna_nombre: str
+    campos: tuple
+    columna_origen: str
+    columna_notas: str
+    nombre_excel: str
+    tolerancia: float = 0.0
+    # Páginas que se leen como máximo en modo de extracción temprana (0 = todas)
+    max_paginas: int = 0
+    # Las cartas en inglés parten "May, 2025" con espacios arbitrarios
+    ancla_sin_espacios: bool = False
+    # Caracteres desde la línea del ancla donde se buscan los campos (0 = todo el texto): el costo
+    # por carta no crece con anexos largos y un campo ausente no recorre el documento entero
+    ventana: int = 8000
+    # Año que sustituye a {anio} en los patrones (el del corte de salario); None acepta cualquiera
+    anio: int = None
+    # Frase propia de la carta dentro de su ventana; separa plantillas con la misma ancla en el modo consolidado
+    distintivo: str = ""
+    _ancla: re.Pattern = field(init=False, repr=False, compare=False)
+    _distintivo: re.Pattern = field(init=False, repr=False, compare=False)
+    _patrones: tuple = field(init=False, repr=False, compare=False)
+    _combinado: re.Pattern = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        anio = CUALQUIER_ANIO if self.anio is None else str(int(self.anio))
+        fuentes = [c.patron.replace("{anio}", anio) for c in self.campos]
+        patrones = tuple(re.compile(patron, re.IGNORECASE) for patron in fuentes)
+        # Un solo recorrido del texto: lookahead con todas las alternativas marca cada
+        # posición donde empieza algún campo, sin consumir texto entre coincidencias
+        combinado = re.compile("(?=" + "|".join(f"(?:{patron})" for patron in fuentes) + ")", re.IGNORECASE)
+        object.__setattr__(self, "_ancla", re.compile(self.ancla, re.IGNORECASE))
+        object.__setattr__(self, "_distintivo", re.compile(self.distintivo, re.IGNORECASE) if self.distintivo else None)
+        object.__setattr__(self, "_patrones", patrones)
+        object.__setattr__(self, "_combinado", combinado)
+
+    @property
+    def columnas(self):
+        return [self.columna_nombre] + [c.columna for c in self.campos]
+
+    def con_anio(self, anio):
+        return replace(self, anio=anio)
+
+
+def es_ancla(linea, plantilla):
+    linea = re.sub(r'\s+', '', linea) if plantilla.ancla_sin_espacios else linea.strip()
+    return plantilla._ancla.search(linea) is not None
+
+
+def tiene_ancla(texto, plantilla):
+    return ubicar_ancla(texto, plantilla) is not None
+
+
+def ubicar_ancla(texto, plantilla):
+    # Posición donde empieza la línea del ancla; se recorren las líneas solo hasta encontrarla
+    for linea in LINEA.finditer(texto):
+        if not linea.group():
+            break
+        if es_ancla(linea.group(), plantilla):
+            return linea.start()
+    return None
+
+
+def nombre_tras_ancla(texto, inicio):
+    # Primera línea no vacía después de la del ancla
+    lineas = LINEA.finditer(texto, inicio)
+    next(lineas)
+    for linea in lineas:
+        if not linea.group():
+            break
+        siguiente = linea.group().strip()
+        if siguiente:
+            return siguiente
+    return None
+
+
+def extraer_nombre(texto, plantilla):
+    inicio = ubicar_ancla(texto, plantilla)
+    return nombre_tras_ancla(texto, inicio) if inicio is not None else None
+
+
+def seccion(texto, plantilla, inicio=None):
+    # Parte del texto donde se buscan los campos: la ventana que empieza en la línea del ancla
+    if not plantilla.ventana:
+        return texto
+    inicio = ubicar_ancla(texto, plantilla) if inicio is None else inicio
+    if inicio is None:
+        return texto[:plantilla.ventana]
+    return texto[inicio:inicio + plantilla.ventana]
+
+
+def buscar_campos(texto, plantilla):
+    # Equivale a un re.search por campo: en cada posición candidata se prueban los campos
+    # aún no encontrados, así gana siempre la coincidencia más a la izquierda de cada uno
+    encontrados = [None] * len(plantilla.campos)
+    faltan = len(encontrados)
+    for candidato in plantilla._combinado.finditer(texto):
+        pos = candidato.start()
+        for i, patron in enumerate(plantilla._patrones):
+            if encontrados[i] is None:
+                m = patron.match(texto, pos)
+                if m:
+                    encontrados[i] = m.group(1)
+                    faltan -= 1
+        if not faltan:
+            break
+    return encontrados
+
+
+def extraer_datos(texto, plantilla, inicio=None):
+    # `inicio`: posición del ancla si ya se conoce; los campos se buscan solo en su ventana
+    encontrados = buscar_campos(seccion(texto, plantilla, inicio), plantilla)
+    if any(valor is None for valor in encontrados):
+        return None
+    datos = []
+    for campo, valor in zip(plantilla.campos, encontrados):
+        valor = limpiar(valor)
+        if campo.decimales:
+            try:
+                valor = "{:.2f}".format(float(valor))
+            except ValueError:
+                return None
+        datos.append(valor)
+    return tuple(datos)
+
+
+def elegir_plantilla(texto, plantillas):
+    # Plantilla de una carta cuyo tipo no se conoce: entre las que encuentran su ancla, gana la que
+    # tiene su frase distintiva y, después, la que encuentra más campos (proporción y cantidad).
+    # None si ninguna ancla aparece
+    mejor, puntaje = None, None
+    for plantilla in plantillas:
+        inicio = ubicar_ancla(texto, plantilla)
+        if inicio is None:
+            continue
+        ventana = seccion(texto, plantilla, inicio)
+        encontrados = sum(valor is not None for valor in buscar_campos(ventana, plantilla))
+        distintivo = plantilla._distintivo is not None and plantilla._distintivo.search(ventana) is not None
+        candidato = (distintivo, encontrados / len(plantilla.campos), encontrados)
+        if puntaje is None or candidato > puntaje:
+            mejor, puntaje = plantilla, candidato
+    return mejor
+
+
+def lectura_suficiente(texto, plantilla):
+    # True si leer más páginas ya no cambia el resultado: el nombre y todos los campos aparecen
+    # en líneas terminadas (la última puede continuar en la página siguiente), o la ventana de
+    # campos tras el ancla ya está entera en el texto leído
+    corte = texto.rfind("\n")
+    if corte < 0:
+        return False
+    prefijo = texto[:corte]
+    inicio = ubicar_ancla(prefijo, plantilla)
+    if inicio is None or nombre_tras_ancla(prefijo, inicio) is None:
+        return False
+    if plantilla.ventana and len(prefijo) >= inicio + plantilla.ventana:
+        return True
+    return None not in buscar_campos(seccion(prefijo, plantilla, inicio), plantilla)
+
+
+def clasificacion_decidida(texto, elegida, plantillas):
+    # True si leer más páginas ya no cambia lo que elige elegir_plantilla: la elegida ya muestra su
+    # frase distintiva en líneas terminadas, o cada plantilla cuya ancla aparece tiene su ventana entera
+    corte = texto.rfind("\n")
+    if corte < 0:
+        return False
+    prefijo = texto[:corte]
+    if elegida._distintivo is not None and elegida._distintivo.search(seccion(prefijo, elegida)) is not None:
+        return True
+    for plantilla in plantillas:
+        inicio = ubicar_ancla(prefijo, plantilla)
+        if inicio is not None and not (plantilla.ventana and len(prefijo) >= inicio + plantilla.ventana):
+            return False
+    return True
+
+
+def comparar_columnas(extraidos, esperados, plantilla):
+    # Máscara (filas × campos) de coincidencias en una sola operación de NumPy, en centavos enteros:
+    # `esperados` ya viene en centavos (preparar_csv) y lo leído del PDF, ya limpio, se convierte aquí.
+    # Un valor que no es número no coincide nunca; las tolerancias de la plantilla se pasan a centavos
+    extraidos = np.asarray(extraidos, dtype=object)
+    forma = extraidos.shape
+    pdf, pdf_valido = _centavos(pd.to_numeric(extraidos.ravel(), errors="coerce"))
+    pdf, pdf_valido = pdf.reshape(forma), pdf_valido.reshape(forma)
+    esperados = pd.DataFrame(esperados)
+    csv_valido = esperados.notna().to_numpy()
+    csv = esperados.to_numpy(dtype=np.int64, na_value=0)
+    absoluta = np.array([round(100 * (plantilla.tolerancia if c.tolerancia is None else c.tolerancia))
+                         for c in plantilla.campos])
+    relativa = np.array([c.tolerancia_relativa for c in plantilla.campos])
+    diferencia = np.abs(pdf - csv)
+    coincide = (diferencia == 0) | (diferencia < absoluta) | (diferencia <= relativa * np.abs(csv))
+    return pdf_valido & csv_valido & coincide
+
+
+# El año del corte de salario cambia cada ciclo: {anio} lo pone la plantilla
+_SALARIO_ES = r'\b{anio}\b.*?:\s*([\d,]+(?:\.\d{2})?)'
+_SALARIO_EN = r'December {anio}.*?([\d,]+\.\d{2})'
+
+PLANTILLAS = {
+    p.clave: p for p in (
+        Plantilla(
+            clave="acciones_es",
+            titulo="Acciones",
+            idioma="es",
+            ancla=r'^Junio\s+\d{4}$',
+            columna_nombre="Nombre",
+            campos=(
+                Campo("Acciones", r'asignado.*?([\d,]+)'),
+                Campo("Factor financiero", r'reportas.*?:\s*([\d]+)'),
+                Campo("Target", r'corresponden.*?:\s*([\d]+)'),
+                Campo("Salario Diario", _SALARIO_ES, decimales=True),
+                Campo("Acciones MXN", r'equivalente a\s*([\d,]+(?:\.\d{2})?)', decimales=True),
+            ),
+            columna_origen="Origen PDF",
+            columna_notas="Notas",
+            nombre_excel="comaparacion_accionesESP.xlsx",
+            tolerancia=0.01,
+            max_paginas=4,
+            distintivo=r"acciones virtuales",
+        ),
+        Plantilla(
+            clave="acciones_en",
+            titulo="Virtual Shares",
+            idioma="en",
+            ancla=r'^May,\d{4}$',
+            ancla_sin_espacios=True,
+            columna_nombre="NAME",
+            campos=(
+                Campo("VIRTUAL SHARES", r'assigned\s+([\d,\.]+)'),
+                Campo("FINANCIAL FACTOR", r'financial factor.*?(\d+)'),
+                Campo("TARGET BONUS", r'target bonus.*?(\d+(?:\.\d+)?)'),
+                Campo("ANNUAL SALARY", _SALARIO_EN, decimales=True),
+                Campo("VIRTUAL SHARES MXN", r'equivalent to\s+([\d,\.]+)', decimales=True),
+            ),
+            columna_origen="PDF SOURCE",
+            columna_notas="NOTES",
+            nombre_excel="Compare_VirtualShares.xlsx",
+            tolerancia=0.01,
+            max_paginas=4,
+            distintivo=r"virtual shares",
+        ),
+        Plantilla(
+            clave="bono_es",
+            titulo="Bono Diferido",
+            idioma="es",
+            ancla=r'^Mayo\s+\d{4}$',
+            columna_nombre="NOMBRE",
+            campos=(
+                Campo("BONO DIFERIDO", r'asignado.*?([\d,.]+)'),
+                Campo("FACTOR FINANCIERO", r'reportas.*?:\s*([\d]+)'),
+                Campo("DIAS BONO", r'corresponden.*?:\s*([\d]+)'),
+                Campo("SALARIO DIARIO", _SALARIO_ES, decimales=True),
+            ),
+            columna_origen="ORIGEN PDF",
+            columna_notas="NOTAS",
+            nombre_excel="comaparacion_bonoESP.xlsx",
+            max_paginas=4,
+            distintivo=r"bono diferido",
+        ),
+        Plantilla(
+            clave="bono_en",
+            titulo="Deferred Bonus",
+            idioma="en",
+            ancla=r'^May,\d{4}$',
+            ancla_sin_espacios=True,
+            columna_nombre="NAME",
+            campos=(
+                Campo("DEFERRED BONUS", r'assigned\s+([\d,\.]+)'),
+                Campo("FINANCIAL FACTOR", r'financial factor.*?(\d+)'),
+                Campo("TARGET BONUS", r'target bonus.*?(\d+(?:\.\d+)?)'),
+                Campo("ANNUAL SALARY", _SALARIO_EN, decimales=True),
+            ),
+            columna_origen="PDF SOURCE",
+            columna_notas="NOTES",
+            nombre_excel="Compare_DeferredBonus.xlsx",
+            max_paginas=4,
+            distintivo=r"deferred bonus",
+        ),
+    )
+}
@@ -0,0 +1,66 @@
+# 📊 Vista paginada de resultados: filtra sobre el modelo compacto y estiliza solo lo visible
+import numpy as np
+import pandas as pd
+
+from cartas.plantillas import texto_centavos, textos_csv
+
+COLOR_ERROR = 'background-color: #FFCCCC'
+
+
+class VistaResultados:
+    def __init__(self, resultado):
+        self.plantilla = resultado.plantilla
+        self.df = resultado.df
+        self.campos = self.plantilla.columnas[1:]
+        self.filas = np.asarray(resultado.procesados)
+        n = len(self.filas)
+        self.estado = resultado.estado if resultado.estado is not None else np.zeros(n, dtype=np.uint32)
+        self.origenes = np.asarray(resultado.origenes, dtype=object)
+        self.notas = np.asarray(resultado.notas, dtype=object)
+
+    def __len__(self):
+        return len(self.filas)
+
+    def mascara_campos(self, campos):
+        mascara = 0
+        for campo in campos:
+            mascara |= 1 << self.campos.index(campo)
+        return np.uint32(mascara)
+
+    def filtrar(self, solo_errores=False, campos=(), pdf=""):
+        # Posiciones (sobre `procesados`) que cumplen el filtro
+        seleccion = np.ones(len(self.filas), dtype=bool)
+        if solo_errores:
+            seleccion &= self.estado != 0
+        if campos:
+            seleccion &= (self.estado & self.mascara_campos(campos)) != 0
+        if pdf:
+            seleccion &= np.char.find(self.origenes.astype(str), pdf) >= 0
+        return np.flatnonzero(seleccion)
+
+    def pagina(self, posiciones, numero, tamano):
+        inicio = numero * tamano
+        return posiciones[inicio:inicio + tamano]
+
+    def marco(self, posiciones):
+        # DataFrame con ✅/❌ solo para las filas pedidas, más la máscara de estilos equivalente
+        filas = self.filas[posiciones]
+        estado = self.estado[posiciones]
+        visible = self.df.loc[filas].astype(object)
+        estilos = pd.DataFrame("", index=visible.index, columns=list(visible.columns) + [
+            self.plantilla.columna_origen, self.plantilla.columna_notas])
+        for j, campo in enumerate(self.campos):
+            error = (estado >> np.uint32(j)) & 1 == 1
+            texto = texto_centavos(visible[campo], self.plantilla.campos[j].decimales, textos_csv(self.df, campo))
+            visible[campo] = [("❌ " if e else "✅ ") + v for e, v in zip(error, texto)]
+            estilos[campo] = np.where(error, COLOR_ERROR, "")
+        visible[self.plantilla.columna_origen] = self.origenes[posiciones]
+        visible[self.plantilla.columna_notas] = self.notas[posiciones]
+        return visible, estilos
+
+    def styler(self, posiciones):
+        visible, estilos = self.marco(posiciones)
+        if not visible.index.is_unique:
+            # Styler no admite índices repetidos (un mismo empleado en dos PDFs)
+            visible = visible.reset_index(drop=True)
+        return visible.style.apply(lambda _: estilos.to_numpy(), axis=None)
@@ -0,0 +1,85 @@
+# 🚦 Revisión rápida antes de extraer: descarta PDFs vacíos, dañados, cifrados o escaneados
+import os
+
+from cartas.extractores import PdfCifrado, obtener_extractor
+
+# Motivos por los que un archivo no llega a compararse
+VACIO = "vacio"
+NO_ES_PDF = "no_es_pdf"
+DEMASIADO_GRANDE = "demasiado_grande"
+PDF_DANADO = "pdf_danado"
+CIFRADO = "cifrado"
+SIN_PAGINAS = "sin_paginas"
+SIN_CAPA_TEXTO = "sin_capa_texto"
+ERROR_EXTRACCION = "error_extraccion"
+SIN_TEXTO = "sin_texto"
+SIN_NOMBRE = "sin_nombre"
+NO_EN_CSV = "no_en_csv"
+NOMBRE_DUPLICADO = "nombre_duplicado"
+CAMPOS_INCOMPLETOS = "campos_incompletos"
+SIN_PLANTILLA = "sin_plantilla"
+# PDF combinado (o sus primeras páginas) sin el ancla de la plantilla: no hay carta donde partir
+SIN_ANCLA = "sin_ancla"
+PLANTILLA_SIN_CSV = "plantilla_sin_csv"
+
+# Páginas iniciales donde se busca una capa de texto; una carta escaneada solo trae imágenes
+PAGINAS_REVISADAS = 3
+
+
+def max_bytes_pdf():
+    return int(float(os.environ.get("CARTAS_MAX_MB", "100")) * 1024 * 1024)
+
+
+class Rechazo(str):
+    # Texto vacío que además dice por qué: los consumidores de (nombre, texto) no necesitan cambiar
+    def __new__(cls, motivo="", detalle=""):
+        rechazo = super().__new__(cls, "")
+        rechazo.motivo = motivo
+        rechazo.detalle = detalle
+        return rechazo
+
+
+def revisar_tamano(tamano, max_bytes=None):
+    # Solo el tamaño: sirve antes de leer los bytes (p. ej. el declarado por un miembro de un ZIP)
+    max_bytes = max_bytes_pdf() if max_bytes is None else max_bytes
+    if max_bytes and tamano > max_bytes:
+        return Rechazo(DEMASIADO_GRANDE, f"{tamano / 1024 / 1024:.1f} MB")
+    return None
+
+
+def revisar_bytes(datos, max_bytes=None):
+    # Sin abrir el PDF: tamaño y cabecera
+    if not datos:
+        return Rechazo(VACIO)
+    rechazo = revisar_tamano(len(datos), max_bytes)
+    if rechazo is not None:
+        return rechazo
+    if b"%PDF-" not in datos[:1024]:
+        return Rechazo(NO_ES_PDF)
+    return None
+
+
+def abrir_pdf(datos, extractor=None):
+    # (documento, None) si vale la pena extraer; (None, Rechazo) si no. No extrae texto.
+    # `extractor` es el nombre del motor (None = el por defecto); el documento se cierra con su cerrar()
+    rechazo = revisar_bytes(datos)
+    if rechazo is not None:
+        return None, rechazo
+    motor = obtener_extractor(extractor)
+    documento = None
+    try:
+        documento = motor.abrir(datos)
+        paginas = min(motor.paginas(documento), PAGINAS_REVISADAS)
+        if not paginas:
+            rechazo = Rechazo(SIN_PAGINAS)
+        elif not motor.capa_texto(documento, paginas):
+            rechazo = Rechazo(SIN_CAPA_TEXTO)
+    except PdfCifrado:
+        rechazo = Rechazo(CIFRADO)
+    except Exception as e:  # cada motor lanza errores de varios tipos ante PDFs mal formados
+        rechazo = Rechazo(PDF_DANADO, str(e))
+    if rechazo is not None:
+        if documento is not None:
+            motor.cerrar(documento)
+        return None, rechazo
+    return documento, None
@@ -0,0 +1,135 @@
+# 📚 PDF combinado: un solo archivo con todas las cartas, separadas por el ancla de la plantilla
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from cartas.cache import huella, leer_bytes
+from cartas.extraccion import workers_por_defecto
+from cartas.extractores import extractor_por_defecto, obtener_extractor
+from cartas.plantillas import tiene_ancla
+from cartas.revision import SIN_ANCLA, Rechazo, abrir_pdf
+
+PAGINAS_POR_BLOQUE = 100
+
+_lector = None  # (motor, documento) del proceso del pool
+
+
+def _cargar(datos, extractor):
+    # Cada proceso del pool recibe el PDF una sola vez; los bloques solo indican el rango
+    global _lector
+    motor = obtener_extractor(extractor)
+    _lector = motor, motor.abrir(datos)
+
+
+def texto_pagina(motor, documento, i):
+    try:
+        return motor.texto(documento, i)
+    except Exception:  # una página dañada no debe tumbar el documento entero
+        return ""
+
+
+def extraer_bloque(inicio, fin, lector=None):
+    motor, documento = lector or _lector
+    comienzo = time.perf_counter()
+    paginas = [texto_pagina(motor, documento, i) for i in range(inicio, fin)]
+    return paginas, time.perf_counter() - comienzo
+
+
+def bloques(datos, total, workers, contexto=None, tamano=PAGINAS_POR_BLOQUE, extractor=None, documento=None):
+    # (inicio, textos de página) en orden, con como mucho 2 × workers bloques pendientes.
+    # En serie se reutiliza `documento` si ya está abierto
+    rangos = [(inicio, min(inicio + tamano, total)) for inicio in range(0, total, tamano)]
+    motor = obtener_extractor(extractor)
+    if workers <= 1 or len(rangos) <= 1:
+        propio = documento is None
+        documento = motor.abrir(datos) if propio else documento
+        try:
+            for inicio, fin in rangos:
+                yield (inicio, fin), extraer_bloque(inicio, fin, (motor, documento))
+        finally:
+            if propio:
+                motor.cerrar(documento)
+        return
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(rangos)), mp_context=contexto,
+                               initializer=_cargar, initargs=(datos, motor.nombre))
+    try:
+        pendientes = deque()
+        for rango in rangos:
+            pendientes.append((rango, pool.submit(extraer_bloque, *rango)))
+            while pendientes and (len(pendientes) >= 2 * workers or pendientes[0][1].done()):
+                rango_listo, futuro = pendientes.popleft()
+                yield rango_listo, futuro.result()
+        while pendientes:
+            rango_listo, futuro = pendientes.popleft()
+            yield rango_listo, futuro.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def segmentar_documentos(documentos, plantilla, workers=None, progreso=None, contexto=None, instrumentacion=None,
+                         huellas=None, extractor=None):
+    # Genera (nombre#pX-Y, texto) por cada carta: una carta empieza en cada página donde aparece
+    # el ancla de la plantilla y sigue hasta la anterior a la próxima ancla. Las páginas se leen
+    # por bloques en paralelo y solo se une el texto de una carta a la vez, nunca el del documento.
+    # El progreso se cuenta en páginas del PDF que se está leyendo. Con el dict `huellas`, cada carta
+    # queda identificada por la huella del PDF combinado más su rango de páginas.
+    # Nada se pierde en silencio: las páginas antes de la primera ancla, o el PDF entero si no
+    # tiene ninguna, salen como Rechazo(SIN_ANCLA)
+    workers = workers_por_defecto() if workers is None else workers
+    motor = obtener_extractor(extractor or extractor_por_defecto())
+    for nombre, archivo in documentos:
+        if isinstance(archivo, Rechazo):
+            # Miembro de un ZIP/TAR rechazado sin leerlo (demasiado grande)
+            if huellas is not None:
+                huellas[nombre] = None
+            yield nombre, archivo
+            continue
+        datos = leer_bytes(archivo)
+        base = huella(datos) if huellas is not None else None
+        documento, rechazo = abrir_pdf(datos, motor.nombre)
+        if rechazo is not None:
+            if huellas is not None:
+                huellas[nombre] = base
+            yield nombre, rechazo
+            continue
+        paginas = motor.paginas(documento)
+        actual = None  # (primera página, textos de página)
+        try:
+            for (inicio, fin), (textos, segundos) in bloques(datos, paginas, workers, contexto,
+                                                             extractor=motor.nombre, documento=documento):
+                if instrumentacion is not None:
+                    instrumentacion.registrar("extract_text", segundos, nombre, paginas=paginas)
+                for i, texto in enumerate(textos, start=inicio):
+                    if tiene_ancla(texto, plantilla):
+                        if actual is not None:
+                            yield segmento(nombre, *actual, base, huellas)
+                        elif i > 0:
+                            yield sin_ancla(f"{nombre}#{rango(0, i)}", f"{base}#{rango(0, i)}", huellas)
+                        actual = (i, [texto])
+                    elif actual is not None:
+                        actual[1].append(texto)
+                if progreso:
+                    progreso(fin, paginas)
+        finally:
+            motor.cerrar(documento)
+        if actual is not None:
+            yield segmento(nombre, *actual, base, huellas)
+        else:
+            yield sin_ancla(nombre, base, huellas)
+
+
+def rango(primera, paginas):
+    return f"p{primera + 1}" if paginas == 1 else f"p{primera + 1}-{primera + paginas}"
+
+
+def segmento(nombre, primera, textos, base=None, huellas=None):
+    paginas = rango(primera, len(textos))
+    if huellas is not None:
+        huellas[f"{nombre}#{paginas}"] = f"{base}#{paginas}"
+    return f"{nombre}#{paginas}", "".join(textos)
+
+
+def sin_ancla(nombre, clave, huellas=None):
+    if huellas is not None:
+        huellas[nombre] = clave
+    return nombre, Rechazo(SIN_ANCLA)
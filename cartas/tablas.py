@@ -0,0 +1,97 @@
+# 📋 Tabla esperada tipada: CSV, Parquet, Arrow o Excel, normalizada una vez por contenido
+import io
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from cartas.cache import huella, leer_bytes
+from cartas.motor import preparar_csv
+
+# Extensiones aceptadas; Parquet y Arrow necesitan pyarrow
+TIPOS_TABLA = ["csv", "parquet", "arrow", "feather", "xlsx"]
+
+
+class ColumnasFaltantes(ValueError):
+    def __init__(self, columnas):
+        super().__init__(", ".join(columnas))
+        self.columnas = columnas
+
+
+def leer_tabla(datos, nombre, plantilla):
+    # El nombre siempre como texto. Los importes se dejan al parser: una columna numérica llega como
+    # float y pasa a centavos sin volver a texto (exacto hasta 2**53 centavos); una con comas o "%"
+    # llega como texto y se limpia. Parquet y Arrow ya traen sus tipos
+    extension = nombre.lower().rsplit(".", 1)[-1]
+    buffer = io.BytesIO(datos)
+    if extension == "parquet":
+        return pd.read_parquet(buffer)
+    if extension in ("arrow", "feather"):
+        return pd.read_feather(buffer)
+    texto = {plantilla.columna_nombre: "string"}
+    if extension == "xlsx":
+        return pd.read_excel(buffer, dtype=texto)
+    return pd.read_csv(buffer, dtype=texto)
+
+
+def clave_tabla(datos, plantilla):
+    return f"{huella(datos)}-{plantilla.clave}"
+
+
+class CacheTablas:
+    """LRU en memoria de tablas ya normalizadas, acotada en bytes."""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._tablas = OrderedDict()  # clave → (df, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self):
+        return len(self._tablas)
+
+    def obtener(self, clave):
+        with self._lock:
+            guardada = self._tablas.get(clave)
+            if guardada is None:
+                self.fallos += 1
+                return None
+            self._tablas.move_to_end(clave)
+            self.aciertos += 1
+            return guardada[0]
+
+    def guardar(self, clave, df):
+        tamano = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if tamano > self.max_bytes:
+                return
+            anterior = self._tablas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._tablas[clave] = (df, tamano)
+            self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                _, (_, expulsada) = self._tablas.popitem(last=False)
+                self._bytes -= expulsada
+
+
+def cargar_tabla(archivo, plantilla, cache=None, nombre=None):
+    # Tabla leída y normalizada con preparar_csv; lanza ColumnasFaltantes si no trae las de la
+    # plantilla. Con `cache`, el mismo archivo (por huella) no se vuelve a leer: el df devuelto se
+    # comparte entre ejecuciones y nadie lo modifica después de normalizarlo
+    datos = leer_bytes(archivo)
+    nombre = nombre or getattr(archivo, "name", str(archivo))
+    clave = clave_tabla(datos, plantilla)
+    df = cache.obtener(clave) if cache is not None else None
+    if df is not None:
+        return df
+    df = leer_tabla(datos, nombre, plantilla)
+    faltantes = [col for col in plantilla.columnas if col not in df.columns]
+    if faltantes:
+        raise ColumnasFaltantes(faltantes)
+    df = preparar_csv(df, plantilla)
+    if cache is not None:
+        cache.guardar(clave, df)
+    return df
@@ -0,0 +1,127 @@
+# 🧵 Validaciones en segundo plano: sobreviven a los reruns de Streamlit y se pueden cancelar
+import threading
+import time
+import traceback
+import uuid
+
+from cartas.archivos import anotar_archivos
+from cartas.consumo import MedicionRSS
+from cartas.extraccion import extraer_documentos
+from cartas.indice import UMBRAL_SIMILITUD, IndiceNombres
+from cartas.motor import comparar_campos, leer_campos
+from cartas.segmentos import segmentar_documentos
+
+EN_COLA = "en_cola"
+EJECUTANDO = "ejecutando"
+TERMINADO = "terminado"
+CANCELADO = "cancelado"
+FALLIDO = "fallido"
+
+
+class Trabajo:
+    # Cada `intervalo` segundos se publica un resultado parcial con lo extraído hasta el momento
+    # `documentos` son pares (nombre, archivo), p. ej. de iterar_documentos; se consumen en el hilo
+    # Con `combinado`, cada PDF trae varias cartas y se segmenta por el ancla de la plantilla.
+    # Con `almacen`, el resultado final queda registrado en el historial (id en `ejecucion`)
+    def __init__(self, df, documentos, plantilla, total=None, firma=None, memoria=None, lectura_parcial=True,
+                 combinado=False, umbral=UMBRAL_SIMILITUD, almacen=None, intervalo=1.0, **opciones):
+        self.id = uuid.uuid4().hex[:8]
+        self.firma = firma
+        self.df = df
+        self.documentos = documentos
+        self.plantilla = plantilla
+        # Un solo índice de nombres para los resultados parciales y el final
+        self.indice = IndiceNombres(df[plantilla.columna_nombre], umbral)
+        self.memoria = memoria
+        self.lectura_parcial = lectura_parcial
+        self.combinado = combinado
+        self.almacen = almacen
+        self.huellas = {}
+        self.archivos = []  # nombres de los archivos de entrada ya leídos (en combinado dan varias cartas)
+        self.ejecucion = None
+        self.intervalo = intervalo
+        self.opciones = opciones  # se pasan tal cual a extraer_documentos (cache, workers, instrumentacion...)
+        self.estado = EN_COLA
+        self.hechos = 0
+        self.total = total
+        self.parcial = None
+        self.resultado = None
+        self.error = None
+        self.inicio = None
+        self.fin = None
+        # Pico de RSS de la ejecución (MedicionRSS.resumen), al terminar
+        self.consumo = None
+        self._cancelar = threading.Event()
+        self._hilo = None
+
+    @property
+    def activo(self):
+        return self.estado in (EN_COLA, EJECUTANDO)
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._ejecutar, name=f"trabajo-{self.id}", daemon=True)
+        self._hilo.start()
+        return self
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    def esperar(self, timeout=None):
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        return self.resultado
+
+    def _progreso(self, hechos, total):
+        self.hechos, self.total = hechos, total
+
+    def _comparar(self, lecturas, omitidos, memoria=None, instrumentacion=None):
+        # Los parciales reciben copias: comparar_campos sigue llenando la lista de omitidos que se le pasa
+        return comparar_campos(self.df, list(lecturas), self.plantilla, indice=self.indice, memoria=memoria,
+                               instrumentacion=instrumentacion, omitidos=list(omitidos))
+
+    def _ejecutar(self):
+        self.estado = EJECUTANDO
+        self.inicio = time.time()
+        medicion = MedicionRSS()
+        # Solo se guardan los campos de cada carta; el texto se suelta en cuanto se leen
+        lecturas = []
+        omitidos = []
+        instrumentacion = self.opciones.get("instrumentacion")
+        if self.memoria is not None:
+            self.memoria.iniciar()
+        documentos = anotar_archivos(self.documentos, self.archivos)
+        if self.combinado:
+            # El texto de un PDF combinado se lee por bloques de páginas y no pasa por la caché
+            opciones = {k: v for k, v in self.opciones.items() if k not in ("cache", "en_vuelo")}
+            textos = segmentar_documentos(documentos, self.plantilla, progreso=self._progreso,
+                                          huellas=self.huellas, **opciones)
+        else:
+            textos = extraer_documentos(documentos, progreso=self._progreso, total=self.total,
+                                        plantilla=self.plantilla if self.lectura_parcial else None,
+                                        huellas=self.huellas, **self.opciones)
+        try:
+            publicado = time.monotonic()
+            for lectura in leer_campos(textos, self.plantilla, omitidos, self.memoria, instrumentacion):
+                if self._cancelar.is_set():
+                    break
+                lecturas.append(lectura)
+                if time.monotonic() - publicado >= self.intervalo:
+                    self.parcial = self._comparar(lecturas, omitidos)
+                    publicado = time.monotonic()
+            if self._cancelar.is_set():
+                self.parcial = self._comparar(lecturas, omitidos)
+                self.estado = CANCELADO
+            else:
+                self.resultado = self._comparar(lecturas, omitidos, self.memoria, instrumentacion)
+                self.parcial = None
+                if self.almacen is not None:
+                    self.ejecucion = self.almacen.registrar_ejecucion(self.resultado, self.huellas, len(self.archivos))
+                self.estado = TERMINADO
+        except Exception:
+            self.error = traceback.format_exc()
+            self.estado = FALLIDO
+        finally:
+            # Cerrar el generador cancela las extracciones pendientes del pool
+            textos.close()
+            self.fin = time.time()
+            self.consumo = medicion.resumen()
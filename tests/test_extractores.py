@@ -0,0 +1,58 @@
+# ⚖️ Paridad de motores: cada extractor instalado da, carta por carta, los campos que trae la carta
+#   python -m pytest -q tests
+import pytest
+
+from benchmarks.sinteticos import generar_lote
+from cartas.extraccion import extraer_documentos
+from cartas.extractores import POR_DEFECTO, Extractor, disponibles
+from cartas.motor import comparar_documentos, extraer_campos, preparar_csv
+from cartas.plantillas import PLANTILLAS
+
+CARTAS = 20
+
+
+@pytest.fixture(scope="module", params=sorted(PLANTILLAS))
+def lote(request):
+    # Sin errores ni cartas fuera del CSV: lo esperado es exactamente lo que dice cada carta
+    clave = request.param
+    pdfs, df = generar_lote(clave, CARTAS, tasa_error=0, tasa_sin_csv=0, paginas_anexo=1)
+    return PLANTILLAS[clave], pdfs, df
+
+
+def leer(pdfs, plantilla, extractor, lectura_parcial):
+    return list(extraer_documentos(pdfs, workers=1, extractor=extractor,
+                                   plantilla=plantilla if lectura_parcial else None))
+
+
+@pytest.mark.parametrize("lectura_parcial", [True, False])
+@pytest.mark.parametrize("extractor", disponibles())
+def test_campos_de_la_carta(lote, extractor, lectura_parcial):
+    plantilla, pdfs, df = lote
+    textos = leer(pdfs, plantilla, extractor, lectura_parcial)
+    resultado = comparar_documentos(preparar_csv(df.copy(), plantilla), textos, plantilla)
+    assert resultado.omitidos == []
+    assert len(resultado.procesados) == CARTAS
+    assert resultado.errores_por_fila == {}
+
+
+@pytest.mark.parametrize("extractor", [nombre for nombre in disponibles() if nombre != POR_DEFECTO])
+def test_mismos_campos_que_pypdf2(lote, extractor):
+    plantilla, pdfs, _ = lote
+    referencia = {nombre: extraer_campos(texto, plantilla)
+                  for nombre, texto in leer(pdfs, plantilla, POR_DEFECTO, True)}
+    campos = {nombre: extraer_campos(texto, plantilla) for nombre, texto in leer(pdfs, plantilla, extractor, True)}
+    assert campos == referencia
+
+
+def test_extractor_incompleto_no_se_instancia():
+    class SinTexto(Extractor):
+        nombre = "sin_texto"
+
+        def abrir(self, datos):
+            return datos
+
+        def paginas(self, documento):
+            return 1
+
+    with pytest.raises(TypeError):
+        SinTexto()